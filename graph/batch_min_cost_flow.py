@@ -0,0 +1,106 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from graph import min_cost_flow, network_mps
+from graph.min_cost_flow import SimpleMinCostFlow, build_network
+
+STATUS_NAMES = {
+    getattr(SimpleMinCostFlow, name): name
+    for name in ["NOT_SOLVED", "OPTIMAL", "FEASIBLE", "INFEASIBLE",
+                 "UNBALANCED", "BAD_RESULT", "BAD_COST_RANGE",
+                 "BAD_CAPACITY_RANGE"]
+    if hasattr(SimpleMinCostFlow, name)
+}
+
+
+def find_networks(patterns):
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for ext in ["*.nwk", "*.mps"]:
+                files.extend(sorted(glob.glob(os.path.join(pattern, ext))))
+        else:
+            files.extend(sorted(glob.glob(pattern)))
+    return files
+
+
+def init_worker():
+    # pay the solver import and first-use cost once per worker
+    nwk = SimpleMinCostFlow()
+    nwk.AddArcWithCapacityAndUnitCost(0, 1, 1, 1)
+    nwk.Solve()
+
+
+def solve_file(filename):
+    start = time.time()
+    if filename.endswith(".mps"):
+        network = network_mps.parse_network(filename)
+    else:
+        network = min_cost_flow.parse_network(filename)
+    nwk = build_network(network)
+    parse_time = time.time() - start
+    start = time.time()
+    status = nwk.Solve()
+    solve_time = time.time() - start
+    return {
+        "file": filename,
+        "status": STATUS_NAMES.get(status, str(status)),
+        "optimal": nwk.OptimalCost() if status == nwk.OPTIMAL else None,
+        "num_node": nwk.NumNodes(),
+        "num_arc": nwk.NumArcs(),
+        "parse_time": parse_time,
+        "solve_time": solve_time,
+    }
+
+
+def run_batch(files, workers=None, out=sys.stdout):
+    start = time.time()
+    num_optimal = 0
+    num_arc = 0
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=init_worker) as executor:
+        futures = {executor.submit(solve_file, f): f for f in files}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"file": futures[future], "status": "ERROR",
+                          "error": str(e)}
+            num_optimal += result["status"] == "OPTIMAL"
+            num_arc += result.get("num_arc", 0)
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    elapsed = time.time() - start
+    return {
+        "instances": len(files),
+        "optimal": num_optimal,
+        "arcs": num_arc,
+        "wall_time": elapsed,
+        "instances_per_sec": len(files) / elapsed if elapsed > 0 else 0,
+    }
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        description="Solve many min cost flow instances in parallel")
+    parser.add_argument("inputs", nargs="+",
+                        help="network files, directories or glob patterns")
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("-o", "--output", help="JSON lines output file")
+    args = parser.parse_args()
+    files = find_networks(args.inputs)
+    if args.output:
+        with open(args.output, "w") as out:
+            summary = run_batch(files, args.workers, out)
+    else:
+        summary = run_batch(files, args.workers)
+    sys.stderr.write("Batch %s\n" % json.dumps(summary))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from graph.min_cost_flow import IncrementalMinCostFlow, build_network, \
+    parse_network, parse_network_cached, read_network
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "data", "nwk")
+
+
+def bench_snapshot(filename, repeat=5):
+    start = time.time()
+    for _ in range(repeat):
+        network = parse_network(filename)
+    text_time = (time.time() - start) / repeat
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "network.snap")
+        parse_network_cached(filename, cache_path)
+        start = time.time()
+        for _ in range(repeat):
+            cached = parse_network_cached(filename, cache_path)
+        cache_time = (time.time() - start) / repeat
+        nwk = build_network(cached)
+        nwk.Solve()
+        optimal = nwk.OptimalCost()
+    print("%s arcs=%d text=%.4fs cached=%.6fs speedup=%.1fx optimal=%d" % (
+        os.path.basename(filename), network.num_arcs, text_time, cache_time,
+        text_time / cache_time, optimal))
+
+
+def bench_parse(filename, repeat=5):
+    start = time.time()
+    for _ in range(repeat):
+        nwk = read_network(filename)
+    line_time = (time.time() - start) / repeat
+    start = time.time()
+    for _ in range(repeat):
+        network = parse_network(filename)
+    parse_time = (time.time() - start) / repeat
+    start = time.time()
+    for _ in range(repeat):
+        bulk = build_network(network)
+    build_time = (time.time() - start) / repeat
+    nwk.Solve()
+    bulk.Solve()
+    assert nwk.OptimalCost() == bulk.OptimalCost()
+    print("%s arcs=%d per-arc=%.4fs vectorized parse=%.4fs build=%.4fs "
+          "speedup=%.1fx" % (os.path.basename(filename), network.num_arcs,
+                             line_time, parse_time, build_time,
+                             line_time / (parse_time + build_time)))
+
+
+def bench_resolve(filename, edit, ticks=20, k=5, seed=0):
+    rng = np.random.default_rng(seed)
+    inc = IncrementalMinCostFlow.from_file(filename)
+    inc.solve()
+    resolve_time = 0
+    rebuild_time = 0
+    for _ in range(ticks):
+        arcs = rng.choice(inc.network.num_arcs, size=k, replace=False)
+        nodes = rng.choice(inc.network.num_nodes, size=2 * k, replace=False)
+        costs = inc.network.costs[arcs] + rng.integers(-5, 6, size=k)
+        delta = rng.integers(1, 10, size=k)
+        supplies = inc.network.supplies[nodes] + np.concatenate([delta, -delta])
+
+        start = time.time()
+        if edit == "cost":
+            inc.set_cost(arcs, costs)
+        else:
+            inc.set_supply(nodes, supplies)
+        inc.solve()
+        resolve_time += time.time() - start
+
+        start = time.time()
+        network = parse_network(filename)
+        network.costs[:] = inc.network.costs
+        network.supplies[:] = inc.network.supplies
+        nwk = build_network(network)
+        nwk.Solve()
+        rebuild_time += time.time() - start
+        assert nwk.OptimalCost() == inc.optimal_cost()
+    print("%s %s edits k=%d resolve=%.4fs rebuild=%.4fs speedup=%.1fx" % (
+        os.path.basename(filename), edit, k, resolve_time / ticks,
+        rebuild_time / ticks, rebuild_time / resolve_time))
+
+
+def run():
+    for name in ["rand150.nwk", "hu.nwk"]:
+        for edit in ["supply", "cost"]:
+            bench_resolve(os.path.join(DATA_DIR, name), edit)
+    for name in ["hu.nwk", "cap2.nwk"]:
+        bench_parse(os.path.join(DATA_DIR, name))
+    for name in ["hu.nwk", "cap2.nwk"]:
+        bench_snapshot(os.path.join(DATA_DIR, name))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from graph.min_cost_flow import build_network
+from graph.network_mps import model_network, parse_network
+from lp.mps import parse_mps
+
+
+def write_random_network(filename, num_node, num_arc, seed=0):
+    rng = np.random.default_rng(seed)
+    tails = rng.integers(0, num_node, size=num_arc)
+    heads = (tails + rng.integers(1, num_node, size=num_arc)) % num_node
+    costs = rng.integers(1, 100, size=num_arc)
+    caps = rng.integers(10, 1000, size=num_arc)
+    # a quarter of the arcs are left uncapacitated
+    bounded = rng.random(num_arc) < 0.75
+    supplies = np.zeros(num_node, dtype=np.int64)
+    sources = rng.choice(num_node, size=num_node // 10, replace=False)
+    supplies[sources[::2]] = 100
+    supplies[sources[1::2]] = -100
+    with open(filename, "w") as f:
+        f.write("NAME          rand\nROWS\n N  obj\n")
+        for i in range(num_node):
+            f.write(" E  n%d\n" % i)
+        f.write("COLUMNS\n")
+        for k, (t, h, c) in enumerate(zip(tails.tolist(), heads.tolist(),
+                                          costs.tolist())):
+            f.write("    arc_%d obj %d n%d 1\n    arc_%d n%d -1\n" %
+                    (k, c, t, k, h))
+        f.write("RHS\n")
+        for i in np.flatnonzero(supplies).tolist():
+            f.write("    rhs n%d %d\n" % (i, supplies[i]))
+        f.write("BOUNDS\n")
+        for k in np.flatnonzero(bounded).tolist():
+            f.write(" UP bnd arc_%d %d\n" % (k, caps[k]))
+        f.write("ENDATA\n")
+
+
+def measure(func, filename):
+    tracemalloc.start()
+    start = time.time()
+    network = func(filename)
+    elapsed = time.time() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return network, elapsed, peak
+
+
+def run(num_node=10000, num_arc=200000):
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "network.mps")
+        write_random_network(filename, num_node, num_arc)
+        for label, func in [
+            ("parse_mps", lambda f: model_network(parse_mps(f))),
+            ("streaming", parse_network),
+        ]:
+            network, elapsed, peak = measure(func, filename)
+            nwk = build_network(network)
+            nwk.Solve()
+            print("%-10s arcs=%d time=%.3fs peak=%.1fMB optimal=%d" % (
+                label, network.num_arcs, elapsed, peak / 2 ** 20,
+                nwk.OptimalCost()))
+
+
+if __name__ == '__main__':
+    run()
@@ -1,9 +1,69 @@
 import sys
 import time
 
-from ortools.graph.pywrapgraph import SimpleMinCostFlow
+import numpy as np
+
+from util import snapshot
+
+try:
+    from ortools.graph.pywrapgraph import SimpleMinCostFlow
+except ImportError:
+    # newer OR-Tools only ships the pybind11 wrapper with snake_case names
+    from ortools.graph.python import min_cost_flow
+
+    class SimpleMinCostFlow(min_cost_flow.SimpleMinCostFlow):
+        SetNodeSupply = min_cost_flow.SimpleMinCostFlow.set_node_supply
+        AddArcWithCapacityAndUnitCost = \
+            min_cost_flow.SimpleMinCostFlow.add_arc_with_capacity_and_unit_cost
+        SetArcCapacity = min_cost_flow.SimpleMinCostFlow.set_arc_capacity
+        Solve = min_cost_flow.SimpleMinCostFlow.solve
+        SolveMaxFlowWithMinCost = \
+            min_cost_flow.SimpleMinCostFlow.solve_max_flow_with_min_cost
+        OptimalCost = min_cost_flow.SimpleMinCostFlow.optimal_cost
+        MaximumFlow = min_cost_flow.SimpleMinCostFlow.maximum_flow
+        NumNodes = min_cost_flow.SimpleMinCostFlow.num_nodes
+        NumArcs = min_cost_flow.SimpleMinCostFlow.num_arcs
+        Flow = min_cost_flow.SimpleMinCostFlow.flow
+        Tail = min_cost_flow.SimpleMinCostFlow.tail
+        Head = min_cost_flow.SimpleMinCostFlow.head
+        Capacity = min_cost_flow.SimpleMinCostFlow.capacity
+        Supply = min_cost_flow.SimpleMinCostFlow.supply
+        UnitCost = min_cost_flow.SimpleMinCostFlow.unit_cost
 
 MAX_CAPACITY = 1000000000
+SEPARATORS = np.frombuffer(b",:;\n", dtype=np.uint8)
+
+
+class Network(object):
+    def __init__(self, tails, heads, capacities, costs, supplies):
+        self.tails = tails
+        self.heads = heads
+        self.capacities = capacities
+        self.costs = costs
+        self.supplies = supplies
+
+    @property
+    def num_nodes(self):
+        return len(self.supplies)
+
+    @property
+    def num_arcs(self):
+        return len(self.tails)
+
+    def to_snapshot(self):
+        arrays = {
+            "tails": self.tails,
+            "heads": self.heads,
+            "capacities": self.capacities,
+            "costs": self.costs,
+            "supplies": self.supplies,
+        }
+        return arrays, {}
+
+    @classmethod
+    def from_snapshot(cls, arrays, meta):
+        return cls(arrays["tails"], arrays["heads"], arrays["capacities"],
+                   arrays["costs"], arrays["supplies"])
 
 
 def parse_node(nd_str):
@@ -46,13 +106,174 @@ def read_network(filename):
     return nwk
 
 
+def tokenize_network(data):
+    buf = np.frombuffer(data, dtype=np.uint8)
+    is_digit = (buf >= ord("0")) & (buf <= ord("9"))
+    prev_digit = np.concatenate([[False], is_digit[:-1]])
+    next_digit = np.concatenate([is_digit[1:], [False]])
+    starts = np.flatnonzero(is_digit & ~prev_digit)
+    ends = np.flatnonzero(is_digit & ~next_digit) + 1
+    # digit values weighted by their power of ten inside the token
+    pos = np.flatnonzero(is_digit)
+    lengths = ends - starts
+    tok_id = np.repeat(np.arange(len(starts)), lengths)
+    power = (ends[tok_id] - pos - 1).astype(np.int64)
+    digits = (buf[pos] - ord("0")).astype(np.int64) * 10 ** power
+    offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    values = np.add.reduceat(digits, offsets) if len(starts) else digits
+    negative = buf[np.maximum(starts - 1, 0)] == ord("-")
+    values[negative & (starts > 0)] *= -1
+    # separator following each token
+    sep_pos = np.flatnonzero(np.isin(buf, SEPARATORS))
+    seps = buf[sep_pos[np.searchsorted(sep_pos, ends)]]
+    return values, seps
+
+
+def parse_network(filename):
+    with open(filename, "rb") as f:
+        num_node = int(f.readline())
+        data = f.read() + b"\n"
+    values, seps = tokenize_network(data)
+    # a group is a node "id[, supply]:" or an arc "dst, cost[, cap];"
+    group_end = np.flatnonzero(seps != ord(","))
+    group_start = np.concatenate([[0], group_end[:-1] + 1])
+    group_size = group_end - group_start + 1
+    is_node = seps[group_end] == ord(":")
+
+    node_start = group_start[is_node]
+    nodes = values[node_start]
+    supplies = np.where(group_size[is_node] == 2,
+                        values[np.minimum(node_start + 1, len(values) - 1)], 0)
+
+    is_arc = ~is_node
+    arc_start = group_start[is_arc]
+    arc_size = group_size[is_arc]
+    tails = nodes[np.cumsum(is_node)[is_arc] - 1]
+    heads = values[arc_start]
+    costs = values[arc_start + 1]
+    capacities = np.where(arc_size == 3,
+                          values[np.minimum(arc_start + 2, len(values) - 1)],
+                          MAX_CAPACITY)
+
+    num_node = max(num_node, nodes.max(initial=-1) + 1,
+                   heads.max(initial=-1) + 1)
+    supply_arr = np.zeros(num_node, dtype=np.int64)
+    supply_arr[nodes] = supplies
+    return Network(tails.astype(np.int32), heads.astype(np.int32),
+                   capacities, costs, supply_arr)
+
+
+def parse_network_cached(filename, cache_path=None):
+    arrays, meta = snapshot.load_cached(
+        filename, "nwk", lambda f: parse_network(f).to_snapshot(), cache_path)
+    return Network.from_snapshot(arrays, meta)
+
+
+def build_network(network):
+    nwk = SimpleMinCostFlow()
+    if hasattr(nwk, "add_arcs_with_capacity_and_unit_cost"):
+        nwk.set_nodes_supplies(np.arange(network.num_nodes), network.supplies)
+        nwk.add_arcs_with_capacity_and_unit_cost(
+            network.tails, network.heads, network.capacities, network.costs)
+        return nwk
+    for node, supply in enumerate(network.supplies.tolist()):
+        nwk.SetNodeSupply(node, supply)
+    for tail, head, cap, cost in zip(network.tails.tolist(),
+                                     network.heads.tolist(),
+                                     network.capacities.tolist(),
+                                     network.costs.tolist()):
+        nwk.AddArcWithCapacityAndUnitCost(tail, head, cap, cost)
+    return nwk
+
+
+class IncrementalMinCostFlow(object):
+    def __init__(self, network):
+        self.network = Network(network.tails, network.heads,
+                               np.array(network.capacities, dtype=np.int64),
+                               np.array(network.costs, dtype=np.int64),
+                               np.array(network.supplies, dtype=np.int64))
+        self.nwk = build_network(self.network)
+        self.arc_keys = None
+        self.arc_order = None
+        self.dirty = False
+        self.status = None
+
+    @classmethod
+    def from_file(cls, filename):
+        return cls(parse_network(filename))
+
+    def arc_index(self, tails, heads):
+        num_nodes = self.network.num_nodes
+        if self.arc_keys is None:
+            keys = self.network.tails.astype(np.int64) * num_nodes \
+                + self.network.heads
+            self.arc_order = np.argsort(keys, kind="stable")
+            self.arc_keys = keys[self.arc_order]
+        keys = np.asarray(tails, dtype=np.int64) * num_nodes + heads
+        pos = np.searchsorted(self.arc_keys, keys)
+        pos = np.minimum(pos, len(self.arc_keys) - 1)
+        if np.any(self.arc_keys[pos] != keys):
+            raise KeyError("arc not found in network")
+        return self.arc_order[pos]
+
+    def set_supply(self, nodes, supplies):
+        nodes = np.asarray(nodes, dtype=np.int32)
+        supplies = np.asarray(supplies, dtype=np.int64)
+        self.network.supplies[nodes] = supplies
+        if self.dirty:
+            return
+        if hasattr(self.nwk, "set_nodes_supplies"):
+            self.nwk.set_nodes_supplies(nodes, supplies)
+        else:
+            for node, supply in zip(nodes.tolist(), supplies.tolist()):
+                self.nwk.SetNodeSupply(node, supply)
+
+    def set_capacity(self, arcs, capacities):
+        arcs = np.asarray(arcs, dtype=np.int32)
+        capacities = np.asarray(capacities, dtype=np.int64)
+        self.network.capacities[arcs] = capacities
+        if self.dirty:
+            return
+        if hasattr(self.nwk, "set_arc_capacities"):
+            self.nwk.set_arc_capacities(arcs, capacities)
+        elif hasattr(self.nwk, "SetArcCapacity"):
+            for arc, cap in zip(arcs.tolist(), capacities.tolist()):
+                self.nwk.SetArcCapacity(arc, cap)
+        else:
+            self.dirty = True
+
+    def set_cost(self, arcs, costs):
+        # the solver has no cost setter, rebuild it from the arrays on solve
+        self.network.costs[np.asarray(arcs, dtype=np.int32)] = costs
+        self.dirty = True
+
+    def solve(self):
+        if self.dirty:
+            self.nwk = build_network(self.network)
+            self.dirty = False
+        self.status = self.nwk.Solve()
+        return self.status
+
+    def optimal_cost(self):
+        return self.nwk.OptimalCost()
+
+    def flows(self):
+        # the solver has no flows to read unless the last solve was optimal
+        if self.status != self.nwk.OPTIMAL:
+            raise ValueError("no optimal flow, solve status %s" % self.status)
+        if hasattr(self.nwk, "flows"):
+            return self.nwk.flows(np.arange(self.network.num_arcs))
+        return np.array([self.nwk.Flow(i)
+                         for i in range(self.network.num_arcs)])
+
+
 def run():
     if len(sys.argv) < 2:
         print("USAGE: python %s $FILE" % sys.argv[0])
         return
     filename = sys.argv[1]
     start = time.time()
-    nwk = read_network(filename)
+    nwk = build_network(parse_network(filename))
     print("Network time=%f" % (time.time() - start))
     print("Network NumNode=%d NumArc=%s" % (nwk.NumNodes(), nwk.NumArcs()))
     start = time.time()
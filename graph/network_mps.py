@@ -1,70 +1,156 @@
+import os
 import sys
 import time
+from array import array
 
-from ortools.graph.pywrapgraph import SimpleMinCostFlow
+import numpy as np
 
+from graph.min_cost_flow import MAX_CAPACITY, Network, build_network
 
-def read_network(filename):
-    nwk = SimpleMinCostFlow()
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "data", "mps")
+
+
+def network_arcs(model):
+    # each column is an arc leaving the +1 row and entering the -1 row
+    tails = np.zeros(model.num_cols, dtype=np.int32)
+    heads = np.zeros(model.num_cols, dtype=np.int32)
+    out_arc = model.a_val > 0
+    tails[model.a_col[out_arc]] = model.a_row[out_arc]
+    heads[model.a_col[~out_arc]] = model.a_row[~out_arc]
+    capacities = np.where(np.isinf(model.col_ub), MAX_CAPACITY, model.col_ub)
+    return tails, heads, capacities.astype(np.int64), model.obj.astype(np.int64)
+
+
+def model_network(model):
+    nodes = np.array([int(tag[1:]) for tag in model.row_names], dtype=np.int32)
+    supplies = np.zeros(nodes.max(initial=-1) + 1, dtype=np.int64)
+    supplies[nodes] = model.rhs.astype(np.int64)
+    tails, heads, capacities, costs = network_arcs(model)
+    return Network(nodes[tails], nodes[heads], capacities, costs, supplies)
+
+
+class ColumnNames(object):
+    # column names packed into one buffer, looked up by position or hash
+    def __init__(self):
+        self.blob = bytearray()
+        self.offsets = array("q", [0])
+        self.cursor = 0
+        self.hashes = None
+        self.order = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def add(self, name):
+        self.blob += name.encode("utf-8")
+        self.offsets.append(len(self.blob))
+        self.hashes = None
+
+    def name(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+    def find(self, name):
+        # bounds are usually listed in column order
+        i = self.cursor
+        if i >= len(self) or self.name(i) != name:
+            i = self.search(name)
+        self.cursor = i + 1
+        return i
+
+    def search(self, name):
+        if self.hashes is None:
+            hashes = np.fromiter((hash(self.name(i)) for i in range(len(self))),
+                                 dtype=np.int64, count=len(self))
+            self.order = np.argsort(hashes)
+            self.hashes = hashes[self.order]
+        h = hash(name)
+        k = np.searchsorted(self.hashes, h)
+        while k < len(self.hashes) and self.hashes[k] == h:
+            i = int(self.order[k])
+            if self.name(i) == name:
+                return i
+            k += 1
+        raise KeyError(name)
+
+
+def parse_network(filename):
+    names = ColumnNames()
+    tails = array("i")
+    heads = array("i")
+    costs = array("q")
+    capacities = array("q")
+    supply_nodes = array("i")
+    supply_vals = array("q")
+    obj_name = None
+    num_node = 0
+    cur_arc = None
+    section = None
     with open(filename) as f:
-        # obj
-        for line in f:
-            if line.startswith("ROWS"):
-                break
-        # node
         for line in f:
-            if line.startswith("COLUMNS"):
-                break
-            _, tag = line.strip().split()
-            if tag == "obj":
+            if not line.strip() or line.startswith("*"):
                 continue
-            node = int(tag[1:])
-            nwk.SetNodeSupply(node, 0)
-        # arc
-        cost = 0
-        head = 0
-        tail = 0
-        cur_arc = ""
-        arc_data = {}
-        for line in f:
-            if line.startswith("RHS"):
-                arc_data[cur_arc] = (tail, head, cost)
-                break
-            arc, tag, val = line.strip().split()
-            if arc != cur_arc:
-                arc_data[cur_arc] = (tail, head, cost)
-                cur_arc = arc
-                cost = 0
-                head = 0
-                tail = 0
-            if tag == "obj":
-                cost = int(float(val))
-            elif val == "1":
-                tail = int(tag[1:])
-            elif val == "-1":
-                head = int(tag[1:])
-        # supply
-        for line in f:
-            if line.startswith("RANGES"):
-                break
-            _, tag, val = line.strip().split()
-            node = int(tag[1:])
-            supply = int(float(val))
-            nwk.SetNodeSupply(node, supply)
-        # range
-        for line in f:
-            if line.startswith("BOUNDS"):
-                break
-        # arc capacity
-        for line in f:
-            if line.startswith("ENDATA"):
-                break
-            _, _, arc, val = line.strip().split()
-            tail, head, cost = arc_data[arc]
-            capacity = int(float(val))
-            aid = nwk.AddArcWithCapacityAndUnitCost(tail, head, capacity, cost)
-            # sys.stderr.write("%d %s %d %d %d %d\n" % (aid, arc, tail, head, capacity, cost))
-    return nwk
+            if not line[0].isspace():
+                section = line.split()[0]
+                if section == "ENDATA":
+                    break
+                continue
+            cols = line.split()
+            if section == "COLUMNS":
+                arc = cols[0]
+                if arc != cur_arc:
+                    if "'MARKER'" in cols:
+                        continue
+                    names.add(arc)
+                    tails.append(0)
+                    heads.append(0)
+                    costs.append(0)
+                    capacities.append(MAX_CAPACITY)
+                    cur_arc = arc
+                for k in range(1, len(cols) - 1, 2):
+                    tag, val = cols[k], float(cols[k + 1])
+                    if tag == obj_name:
+                        costs[-1] = int(val)
+                    elif val > 0:
+                        tails[-1] = int(tag[1:])
+                    else:
+                        heads[-1] = int(tag[1:])
+            elif section == "ROWS":
+                op, tag = cols
+                if op == "N":
+                    obj_name = obj_name or tag
+                    continue
+                num_node = max(num_node, int(tag[1:]) + 1)
+            elif section == "RHS":
+                for k in range(len(cols) % 2, len(cols) - 1, 2):
+                    if cols[k] == obj_name:
+                        continue
+                    supply_nodes.append(int(cols[k][1:]))
+                    supply_vals.append(int(float(cols[k + 1])))
+            elif section == "BOUNDS":
+                tag = cols[0]
+                if tag in ("UP", "FX", "LO"):
+                    arc, val = names.find(cols[-2]), float(cols[-1])
+                else:
+                    arc, val = names.find(cols[-1]), 0
+                if tag in ("UP", "FX"):
+                    capacities[arc] = int(val)
+                elif tag == "PL":
+                    capacities[arc] = MAX_CAPACITY
+                if (tag in ("LO", "FX") and val != 0) or tag in ("MI", "FR"):
+                    raise ValueError("lower bound on arc %s" % names.name(arc))
+    supplies = np.zeros(num_node, dtype=np.int64)
+    supplies[np.frombuffer(supply_nodes, dtype=np.int32)] = \
+        np.frombuffer(supply_vals, dtype=np.int64)
+    return Network(np.frombuffer(tails, dtype=np.int32),
+                   np.frombuffer(heads, dtype=np.int32),
+                   np.frombuffer(capacities, dtype=np.int64),
+                   np.frombuffer(costs, dtype=np.int64),
+                   supplies)
+
+
+def read_network(filename):
+    return build_network(parse_network(filename))
 
 
 def print_flow(nwk):
@@ -81,7 +167,10 @@ def print_flow(nwk):
 
 
 def run():
-    filename = "../data/mps/16_n14.mps"
+    # the sample is not shipped with the repo, any network MPS file can be
+    # given instead
+    filename = sys.argv[1] if len(sys.argv) > 1 else \
+        os.path.join(DATA_DIR, "16_n14.mps")
     start = time.time()
     nwk = read_network(filename)
     print("Network time=%f" % (time.time() - start))
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from lp.mps import load_mps, parse_mps
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "data", "mps")
+
+
+def write_random_mps(filename, num_row, num_col, num_nz, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, num_row, size=num_nz)
+    cols = np.sort(rng.integers(0, num_col, size=num_nz))
+    vals = rng.integers(1, 100, size=num_nz)
+    with open(filename, "w") as f:
+        f.write("NAME          rand\n")
+        f.write("ROWS\n")
+        f.write(" N  COST\n")
+        for i in range(num_row):
+            f.write(" L  R%d\n" % i)
+        f.write("COLUMNS\n")
+        last = -1
+        for j, i, a in zip(cols.tolist(), rows.tolist(), vals.tolist()):
+            if j != last:
+                f.write("    X%-9d COST      %d\n" % (j, -(j % 7 + 1)))
+                last = j
+            f.write("    X%-9d R%-9d %d\n" % (j, i, a))
+        f.write("RHS\n")
+        for i in range(num_row):
+            f.write("    RHS       R%-9d %d\n" % (i, 1000))
+        f.write("BOUNDS\n")
+        for j in np.unique(cols).tolist():
+            f.write(" UP bnd       X%-9d %d\n" % (j, 1))
+        f.write("ENDATA\n")
+
+
+def write_bounds_mps(filename):
+    # every bound type, with and without a value, in fixed columns so the
+    # file reads in both formats
+    bounds = [("UP", "X0", "3"), ("LO", "X1", "-2"), ("FX", "X2", "5"),
+              ("FR", "X3", ""), ("FR", "X4", "0"), ("MI", "X5", "1"),
+              ("PL", "X6", "0"), ("BV", "X7", ""), ("BV", "X8", "1"),
+              ("UI", "X9", "4"), ("LI", "X10", "2")]
+    with open(filename, "w") as f:
+        f.write("NAME          bounds\nROWS\n N  COST\n L  LIM\nCOLUMNS\n")
+        for _, var, _ in bounds:
+            f.write("    %-8s  %-8s  %s\n" % (var, "LIM", 1))
+        f.write("RHS\n    %-8s  %-8s  %s\nBOUNDS\n" % ("RHS", "LIM", 10))
+        for tag, var, val in bounds:
+            f.write((" %-2s %-8s  %-8s  %s" % (tag, "BND", var, val))
+                    .rstrip() + "\n")
+        f.write("ENDATA\n")
+
+
+def check_bounds(filename):
+    lb = [0, -2, 5, -np.inf, -np.inf, -np.inf, 0, 0, 0, 0, 2]
+    ub = [3, np.inf, 5, np.inf, np.inf, np.inf, np.inf, 1, 1, 4, np.inf]
+    is_int = [False] * 7 + [True] * 4
+    for fixed in [False, True]:
+        model = parse_mps(filename, fixed)
+        same = np.array_equal(model.col_lb, lb) and \
+            np.array_equal(model.col_ub, ub) and \
+            np.array_equal(model.col_int, is_int)
+        print("bounds fixed=%s matches: %s" % (fixed, same))
+
+
+def bench_file(filename):
+    start = time.time()
+    model = parse_mps(filename)
+    parse_time = time.time() - start
+    solver = pywraplp.Solver("mps",
+                             pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
+    start = time.time()
+    load_mps(model, solver)
+    load_time = time.time() - start
+    print("%s rows=%d cols=%d nz=%d parse=%.4fs load=%.4fs" % (
+        os.path.basename(filename), model.num_rows, model.num_cols,
+        model.num_nonzeros, parse_time, load_time))
+
+
+def run():
+    for name in ["bk4x3.mps", "gr4x6.mps"]:
+        bench_file(os.path.join(DATA_DIR, name))
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "bounds.mps")
+        write_bounds_mps(filename)
+        check_bounds(filename)
+        filename = os.path.join(tmp, "rand1m.mps")
+        write_random_mps(filename, 10000, 100000, 1000000)
+        bench_file(filename)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from lp.mps import load_mps, parse_mps
+from lp.presolve import reduce_knapsack_rows
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "data", "mps")
+
+
+def write_knapsack_mps(filename, num_row, num_col, row_len, seed=0):
+    rng = np.random.default_rng(seed)
+    entries = {j: [] for j in range(num_col)}
+    rhs = []
+    for i in range(num_row):
+        cols = rng.choice(num_col, size=row_len, replace=False)
+        vals = rng.integers(5, 60, size=row_len)
+        rhs.append(int(vals.sum() * 0.4))
+        for j, a in zip(cols.tolist(), vals.tolist()):
+            entries[j].append((i, a))
+    profits = rng.integers(10, 100, size=num_col)
+    with open(filename, "w") as f:
+        f.write("NAME          knap\nROWS\n N  obj\n")
+        for i in range(num_row):
+            f.write(" L  k%d\n" % i)
+        f.write("COLUMNS\n")
+        f.write("    MARKER    'MARKER'  'INTORG'\n")
+        for j in range(num_col):
+            f.write("    x%d obj %d\n" % (j, -profits[j]))
+            for i, a in entries[j]:
+                f.write("    x%d k%d %d\n" % (j, i, a))
+        f.write("    MARKER    'MARKER'  'INTEND'\n")
+        f.write("RHS\n")
+        for i in range(num_row):
+            f.write("    rhs k%d %d\n" % (i, rhs[i]))
+        f.write("BOUNDS\n")
+        for j in range(num_col):
+            f.write(" BV bnd x%d\n" % j)
+        f.write("ENDATA\n")
+
+
+def solve(model):
+    lp = pywraplp.Solver("lp", pywraplp.Solver.GLOP_LINEAR_PROGRAMMING)
+    load_mps(model, lp)
+    lp.Solve()
+    mip = pywraplp.Solver("mip",
+                          pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
+    load_mps(model, mip)
+    start = time.time()
+    mip.Solve()
+    return lp.Objective().Value(), mip.Objective().Value(), mip.nodes(), \
+        time.time() - start
+
+
+def bench_file(filename):
+    model = parse_mps(filename)
+    start = time.time()
+    reduced, stats = reduce_knapsack_rows(model)
+    presolve_time = time.time() - start
+    print("%s candidates=%d reduced=%d presolve=%.3fs" % (
+        os.path.basename(filename), stats["candidates"], stats["reduced"],
+        presolve_time))
+    for label, m in [("original", model), ("reduced", reduced)]:
+        lp_bound, mip_obj, nodes, mip_time = solve(m)
+        print("  %-8s lp=%.4f mip=%.4f nodes=%d time=%.3fs" % (
+            label, lp_bound, mip_obj, nodes, mip_time))
+
+
+def run():
+    for name in ["bk4x3.mps", "gr4x6.mps"]:
+        bench_file(os.path.join(DATA_DIR, name))
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "knapsack.mps")
+        write_knapsack_mps(filename, 15, 40, 10)
+        bench_file(filename)
+
+
+if __name__ == '__main__':
+    run()
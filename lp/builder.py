@@ -0,0 +1,347 @@
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from lp.mps import MpsModel, load_mps
+
+
+class LinExpr(object):
+    # an array of linear expressions of shape S, element s is
+    # sum(coefs[s][q] * x[cols[s][q]]) + const[s]
+    __array_ufunc__ = None
+
+    def __init__(self, cols, coefs, const):
+        self.cols = cols
+        self.coefs = coefs
+        self.const = const
+
+    @classmethod
+    def constant(cls, value):
+        value = np.asarray(value, dtype=float)
+        return cls(np.zeros(value.shape + (0,), dtype=np.int64),
+                   np.zeros(value.shape + (0,)), value)
+
+    @property
+    def shape(self):
+        return self.const.shape
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        # the term axis stays last
+        term_key = key + (slice(None),) if any(k is Ellipsis for k in key) \
+            else key
+        return LinExpr(self.cols[term_key], self.coefs[term_key],
+                       self.const[key])
+
+    def broadcast_to(self, shape):
+        num = self.cols.shape[-1]
+        return LinExpr(np.broadcast_to(self.cols, shape + (num,)),
+                       np.broadcast_to(self.coefs, shape + (num,)),
+                       np.broadcast_to(self.const, shape))
+
+    def __add__(self, other):
+        other = as_expr(other)
+        shape = np.broadcast_shapes(self.shape, other.shape)
+        a = self.broadcast_to(shape)
+        b = other.broadcast_to(shape)
+        return LinExpr(np.concatenate([a.cols, b.cols], axis=-1),
+                       np.concatenate([a.coefs, b.coefs], axis=-1),
+                       a.const + b.const)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return LinExpr(self.cols, -self.coefs, -self.const)
+
+    def __sub__(self, other):
+        return self + (-as_expr(other))
+
+    def __rsub__(self, other):
+        return as_expr(other) + (-self)
+
+    def __mul__(self, other):
+        if isinstance(other, (LinExpr, VarArray)):
+            raise TypeError("only linear expressions are supported")
+        c = np.asarray(other, dtype=float)
+        e = self.broadcast_to(np.broadcast_shapes(self.shape, c.shape))
+        return LinExpr(e.cols, e.coefs * c[..., None], e.const * c)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return self * (1 / np.asarray(other, dtype=float))
+
+    def sum(self, axis=None):
+        if axis is None:
+            return LinExpr(self.cols.reshape(-1), self.coefs.reshape(-1),
+                           self.const.sum())
+        axis = axis % len(self.shape)
+        cols = np.moveaxis(self.cols, axis, -2)
+        coefs = np.moveaxis(self.coefs, axis, -2)
+        shape = cols.shape[:-2] + (-1,)
+        return LinExpr(cols.reshape(shape), coefs.reshape(shape),
+                       self.const.sum(axis=axis))
+
+    def dot(self, c, axis=-1):
+        return (self * c).sum(axis)
+
+    def __le__(self, other):
+        return Constraint(self - other, "L")
+
+    def __ge__(self, other):
+        return Constraint(self - other, "G")
+
+    def __eq__(self, other):
+        return Constraint(self - other, "E")
+
+    __hash__ = None
+
+
+class VarArray(object):
+    # variables addressed through an index tensor of column ids
+    __array_ufunc__ = None
+
+    def __init__(self, builder, idx):
+        self.builder = builder
+        self.idx = idx
+
+    @property
+    def shape(self):
+        return self.idx.shape
+
+    def __getitem__(self, key):
+        return VarArray(self.builder, self.idx[key])
+
+    def expr(self):
+        return LinExpr(self.idx[..., None], np.ones(self.idx.shape + (1,)),
+                       np.zeros(self.idx.shape))
+
+    def value(self):
+        return self.builder.solution[self.idx]
+
+    def sum(self, axis=None):
+        return self.expr().sum(axis)
+
+    def dot(self, c, axis=-1):
+        return self.expr().dot(c, axis)
+
+    def __add__(self, other):
+        return self.expr() + other
+
+    def __radd__(self, other):
+        return self.expr() + other
+
+    def __sub__(self, other):
+        return self.expr() - other
+
+    def __rsub__(self, other):
+        return other - self.expr()
+
+    def __neg__(self):
+        return -self.expr()
+
+    def __mul__(self, other):
+        return self.expr() * other
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return self.expr() / other
+
+    def __le__(self, other):
+        return self.expr() <= other
+
+    def __ge__(self, other):
+        return self.expr() >= other
+
+    def __eq__(self, other):
+        return self.expr() == other
+
+    __hash__ = None
+
+
+class Constraint(object):
+    # expr (sense) 0 for every element of expr
+    def __init__(self, expr, sense):
+        self.expr = expr
+        self.sense = sense
+
+
+def as_expr(x):
+    if isinstance(x, LinExpr):
+        return x
+    if isinstance(x, VarArray):
+        return x.expr()
+    return LinExpr.constant(x)
+
+
+def concatenate(exprs, axis=0):
+    # pad the term axis so expressions with different term counts line up
+    exprs = [as_expr(e) for e in exprs]
+    num = max(e.cols.shape[-1] for e in exprs)
+    cols = []
+    coefs = []
+    for e in exprs:
+        pad = [(0, 0)] * (e.cols.ndim - 1) + [(0, num - e.cols.shape[-1])]
+        cols.append(np.pad(e.cols, pad))
+        coefs.append(np.pad(e.coefs, pad))
+    axis = axis % len(exprs[0].shape)
+    return LinExpr(np.concatenate(cols, axis=axis),
+                   np.concatenate(coefs, axis=axis),
+                   np.concatenate([e.const for e in exprs], axis=axis))
+
+
+def matmul(a, x):
+    # (a @ x)[k, ...] = sum_j a[k, j] * x[j, ...]
+    a = np.asarray(a, dtype=float)
+    x = as_expr(x)
+    tail = (1,) * (len(x.shape) - 1)
+    return (x[None] * a.reshape(a.shape + tail)).sum(axis=1)
+
+
+class ModelBuilder(object):
+    # collects variables and rows as flat arrays and loads them into a
+    # solver in one pass, without building operator expression trees
+    def __init__(self, name="", names=True):
+        self.name = name
+        # per element names cost a python string each, large models skip them
+        self.names = names
+        self.num_cols = 0
+        self.col_lb = []
+        self.col_ub = []
+        self.col_int = []
+        self.col_names = []
+        self.row_sense = []
+        self.rhs = []
+        self.row_names = []
+        self.a_row = []
+        self.a_col = []
+        self.a_val = []
+        self.num_rows = 0
+        self.obj = None
+        self.obj_offset = 0.0
+        self.obj_max = False
+        self.solver = None
+        self.solution = None
+        self.blocks = set()
+
+    def block_name(self, name):
+        # solvers reject duplicate names, repeated block names get a suffix
+        base = name
+        k = 1
+        while name in self.blocks:
+            name = "%s_%d" % (base, k)
+            k += 1
+        self.blocks.add(name)
+        return name
+
+    def var(self, shape, lb=0.0, ub=np.inf, integer=False, name="x"):
+        shape = tuple(np.atleast_1d(shape))
+        num = int(np.prod(shape))
+        idx = np.arange(self.num_cols, self.num_cols + num).reshape(shape)
+        self.col_lb.append(np.broadcast_to(np.asarray(lb, dtype=float),
+                                           shape).reshape(-1))
+        self.col_ub.append(np.broadcast_to(np.asarray(ub, dtype=float),
+                                           shape).reshape(-1))
+        self.col_int.append(np.full(num, integer))
+        self.col_names.append((self.block_name(name), shape))
+        self.num_cols += num
+        return VarArray(self, idx)
+
+    def int_var(self, shape, lb=0.0, ub=np.inf, name="x"):
+        return self.var(shape, lb, ub, True, name)
+
+    def bool_var(self, shape, name="x"):
+        return self.var(shape, 0, 1, True, name)
+
+    def add(self, constraint, name="c"):
+        expr = constraint.expr
+        shape = expr.shape
+        num = int(np.prod(shape))
+        num_terms = expr.cols.shape[-1]
+        cols = expr.cols.reshape(num, num_terms)
+        coefs = expr.coefs.reshape(num, num_terms)
+        rows = np.broadcast_to(np.arange(num)[:, None], cols.shape)
+        keep = coefs != 0
+        self.a_row.append(rows[keep] + self.num_rows)
+        self.a_col.append(cols[keep])
+        self.a_val.append(coefs[keep])
+        self.row_sense.append(np.full(num, constraint.sense))
+        self.rhs.append(-expr.const.reshape(-1))
+        self.row_names.append((self.block_name(name), shape))
+        self.num_rows += num
+
+    def objective(self, expr, maximize=False):
+        expr = as_expr(expr).sum()
+        self.obj = np.zeros(self.num_cols)
+        np.add.at(self.obj, expr.cols, expr.coefs)
+        self.obj_offset = float(expr.const)
+        self.obj_max = maximize
+
+    def minimize(self, expr):
+        self.objective(expr, False)
+
+    def maximize(self, expr):
+        self.objective(expr, True)
+
+    def to_mps_model(self):
+        model = MpsModel(self.name)
+        model.obj_name = "obj"
+        model.maximize = self.obj_max
+        model.obj_offset = self.obj_offset
+        model.row_names = expand_names(self.row_names, self.names)
+        model.row_sense = concat(self.row_sense, "U1")
+        model.rhs = concat(self.rhs, float)
+        model.ranges = np.full(self.num_rows, np.nan)
+        model.col_names = expand_names(self.col_names, self.names)
+        model.col_lb = concat(self.col_lb, float)
+        model.col_ub = concat(self.col_ub, float)
+        model.col_int = concat(self.col_int, bool)
+        model.obj = np.zeros(self.num_cols)
+        if self.obj is not None:
+            model.obj[:len(self.obj)] = self.obj
+        # a variable may appear several times in one row, solvers take the
+        # last coefficient set so the duplicates are summed here
+        keys = concat(self.a_row, np.int64) * self.num_cols + \
+            concat(self.a_col, np.int64)
+        keys, inverse = np.unique(keys, return_inverse=True)
+        vals = np.bincount(inverse, weights=concat(self.a_val, float),
+                           minlength=len(keys))
+        keep = vals != 0
+        model.a_row = (keys[keep] // self.num_cols).astype(np.int32)
+        model.a_col = (keys[keep] % self.num_cols).astype(np.int32)
+        model.a_val = vals[keep]
+        return model
+
+    def solve(self, solver_type=pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING):
+        self.solver = pywraplp.Solver(self.name, solver_type)
+        variables, _ = load_mps(self.to_mps_model(), self.solver)
+        status = self.solver.Solve()
+        self.solution = np.array([x.solution_value() for x in variables])
+        return status
+
+    def value(self, expr):
+        expr = as_expr(expr)
+        if expr.cols.shape[-1] == 0:
+            return expr.const
+        return (self.solution[expr.cols] * expr.coefs).sum(axis=-1) + expr.const
+
+
+def concat(parts, dtype):
+    if not parts:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate(parts).astype(dtype)
+
+
+def expand_names(blocks, named=True):
+    # x[i,j] style names for every element of every block
+    if not named:
+        return [""] * sum(int(np.prod(shape)) for _, shape in blocks)
+    names = []
+    for prefix, shape in blocks:
+        if len(shape) == 0:
+            names.append(prefix)
+            continue
+        for index in np.ndindex(*shape):
+            names.append("%s[%s]" % (prefix, ",".join(map(str, index))))
+    return names
@@ -1,90 +1,333 @@
+import os
+from array import array
+
+import numpy as np
 from ortools.linear_solver import pywraplp
 
+from util import snapshot
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                        "data", "mps")
+
+# field columns of fixed format MPS
+FIXED_FIELDS = [(1, 3), (4, 12), (14, 22), (24, 36), (39, 47), (49, 61)]
+
+
+class MpsModel(object):
+    def __init__(self, name=""):
+        self.name = name
+        self.obj_name = None
+        self.maximize = False
+        self.obj_offset = 0.0
+        self.row_names = []
+        self.row_sense = np.zeros(0, dtype="U1")
+        self.rhs = np.zeros(0)
+        # nan if the row has no range
+        self.ranges = np.zeros(0)
+        self.col_names = []
+        self.col_lb = np.zeros(0)
+        self.col_ub = np.zeros(0)
+        self.col_int = np.zeros(0, dtype=bool)
+        self.obj = np.zeros(0)
+        # coefficient matrix in COO format
+        self.a_row = np.zeros(0, dtype=np.int32)
+        self.a_col = np.zeros(0, dtype=np.int32)
+        self.a_val = np.zeros(0)
+
+    @property
+    def num_rows(self):
+        return len(self.row_names)
+
+    @property
+    def num_cols(self):
+        return len(self.col_names)
+
+    @property
+    def num_nonzeros(self):
+        return len(self.a_val)
+
+    def row_bounds(self, infinity=np.inf):
+        sense = self.row_sense
+        lb = np.where(sense == "L", -infinity, self.rhs)
+        ub = np.where(sense == "G", infinity, self.rhs)
+        has_range = ~np.isnan(self.ranges)
+        r = np.abs(self.ranges)
+        lower = has_range & ((sense == "L") | ((sense == "E") & (self.ranges < 0)))
+        upper = has_range & ((sense == "G") | ((sense == "E") & (self.ranges > 0)))
+        lb[lower] = self.rhs[lower] - r[lower]
+        ub[upper] = self.rhs[upper] + r[upper]
+        return lb, ub
+
+    def to_snapshot(self):
+        arrays = {
+            "row_names": names_to_bytes(self.row_names),
+            "row_sense": np.char.encode(self.row_sense, "ascii"),
+            "rhs": self.rhs,
+            "ranges": self.ranges,
+            "col_names": names_to_bytes(self.col_names),
+            "col_lb": self.col_lb,
+            "col_ub": self.col_ub,
+            "col_int": self.col_int,
+            "obj": self.obj,
+            "a_row": self.a_row,
+            "a_col": self.a_col,
+            "a_val": self.a_val,
+        }
+        meta = {
+            "name": self.name,
+            "obj_name": self.obj_name,
+            "maximize": self.maximize,
+            "obj_offset": self.obj_offset,
+        }
+        return arrays, meta
+
+    @classmethod
+    def from_snapshot(cls, arrays, meta):
+        model = cls(meta["name"])
+        model.obj_name = meta["obj_name"]
+        model.maximize = meta["maximize"]
+        model.obj_offset = meta["obj_offset"]
+        model.row_names = bytes_to_names(arrays["row_names"])
+        model.row_sense = np.char.decode(arrays["row_sense"], "ascii")
+        model.col_names = bytes_to_names(arrays["col_names"])
+        for name in ["rhs", "ranges", "col_lb", "col_ub", "col_int", "obj",
+                     "a_row", "a_col", "a_val"]:
+            setattr(model, name, arrays[name])
+        return model
+
+    def to_csr(self):
+        order = np.argsort(self.a_row, kind="stable")
+        indptr = np.zeros(self.num_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.a_row, minlength=self.num_rows),
+                  out=indptr[1:])
+        return indptr, self.a_col[order], self.a_val[order]
+
+
+def names_to_bytes(names):
+    return np.frombuffer("\n".join(names).encode("utf-8"), dtype=np.uint8)
+
+
+def bytes_to_names(arr):
+    if len(arr) == 0:
+        return []
+    return arr.tobytes().decode("utf-8").split("\n")
 
-def is_obj(tag):
-    return tag in {"obj", "COST"}
 
+def split_fixed(line, section):
+    fields = [line[s:e].strip() for s, e in FIXED_FIELDS]
+    if section == "ROWS":
+        return fields[:2]
+    if section == "BOUNDS":
+        return fields[:4] if fields[3] else fields[:3]
+    cols = fields[1:4] if section == "COLUMNS" or fields[1] else fields[2:4]
+    if fields[4]:
+        cols += fields[4:6]
+    return cols
 
-def is_mark(var):
-    return var in {"MARK", "MARKEND"}
 
+def set_bound(tag, val, j, col_lb, col_ub, col_int):
+    if tag == "UP":
+        col_ub[j] = val
+        if val < 0 and col_lb[j] == 0:
+            col_lb[j] = -np.inf
+    elif tag == "LO":
+        col_lb[j] = val
+    elif tag == "FX":
+        col_lb[j] = val
+        col_ub[j] = val
+    elif tag == "FR":
+        col_lb[j] = -np.inf
+        col_ub[j] = np.inf
+    elif tag == "MI":
+        col_lb[j] = -np.inf
+    elif tag == "PL":
+        col_ub[j] = np.inf
+    elif tag == "BV":
+        col_int[j] = True
+        col_lb[j] = 0
+        col_ub[j] = 1
+    elif tag == "UI":
+        col_int[j] = True
+        col_ub[j] = val
+    elif tag == "LI":
+        col_int[j] = True
+        col_lb[j] = val
+    else:
+        raise ValueError("unsupported bound type %s" % tag)
 
-def read_mps(filename, solver):
+
+def parse_mps(filename, fixed=False):
+    model = MpsModel()
+    row_idx = {}
+    col_idx = {}
+    row_sense = []
+    rhs = []
+    ranges = []
+    col_lb = []
+    col_ub = []
+    col_int = []
+    a_row = array("i")
+    a_col = array("i")
+    a_val = array("d")
+    obj_col = array("i")
+    obj_val = array("d")
+    obj_row = -1
+    free_row = -2
+    is_int = False
+    set_name = {}
+    section = None
     with open(filename) as f:
-        lhs_map = {}
-        row_op = {}
-        rhs_map = {}
-        var_bnd = {}
-        var_map = {}
-        infinity = solver.Infinity()
-        # lp
-        for line in f:
-            if line.startswith("ROWS"):
-                break
-        # rows
         for line in f:
-            if line.startswith("COLUMNS"):
-                break
-            op, tag = line.strip().split()
-            lhs_map[tag] = {}
-            row_op[tag] = op
-        # columns
-        for line in f:
-            if line.startswith("RHS"):
-                break
-            var, tag, val = line.strip().split()
-            if is_mark(var):
+            if not line.strip() or line.startswith("*"):
                 continue
-            var_bnd[var] = {}
-            lhs_map[tag][var] = float(val)
-        # rhs
-        for line in f:
-            if line.startswith("RANGE"):
+            if not line[0].isspace():
+                cols = line.split()
+                section = cols[0]
+                if section == "NAME":
+                    model.name = line[14:].strip() if fixed else " ".join(cols[1:])
+                elif section == "OBJSENSE" and len(cols) > 1:
+                    model.maximize = cols[1].startswith("MAX")
+                elif section == "ENDATA":
+                    break
                 continue
-            if line.startswith("BOUNDS"):
-                break
-            _, tag, val = line.strip().split()
-            rhs_map[tag] = (float(val))
-        # bounds
-        for line in f:
-            if line.startswith("ENDATA"):
-                break
-            cols = line.strip().split()
-            tag = cols[0]
-            var = cols[2]
-            if len(cols) == 4:
-                bnd = float(cols[3])
-                var_bnd[var][tag] = bnd
-            else:
-                var_bnd[var][tag] = True
-
-        # variable
-        for name, bnd in var_bnd.items():
-            bv = bnd.get("BV", False)
-            lb = bnd.get("LO", 0)
-            ub = bnd.get("UP", infinity)
-            # print("%s %f %f %s" % (name, lb, ub, bv))
-            if bv:
-                var_map[name] = solver.BoolVar(name)
+            if fixed:
+                cols = split_fixed(line.rstrip("\n"), section)
             else:
-                var_map[name] = solver.NumVar(lb, ub, name)
-
-        # constraint
-        for cname, variables in lhs_map.items():
-            lhs = 0
-            for name, a in variables.items():
-                lhs += var_map[name] * a
-            rhs = rhs_map.get(cname, 0)
-            op = row_op[cname]
-            # print("%s %s %f" % (cname, op, rhs))
-            if op == "E":
-                solver.Add(lhs == rhs, cname)
-            elif op == "G":
-                solver.Add(lhs >= rhs, cname)
-            elif op == "L":
-                solver.Add(lhs <= rhs, cname)
-            elif op == "N":
-                solver.Minimize(lhs)
+                cols = line.split()
+            if section == "COLUMNS":
+                var = cols[0]
+                if "'MARKER'" in cols:
+                    if "'INTORG'" in cols:
+                        is_int = True
+                    elif "'INTEND'" in cols:
+                        is_int = False
+                    continue
+                j = col_idx.get(var)
+                if j is None:
+                    j = col_idx[var] = len(model.col_names)
+                    model.col_names.append(var)
+                    col_lb.append(0.0)
+                    col_ub.append(np.inf)
+                    col_int.append(is_int)
+                for k in range(1, len(cols) - 1, 2):
+                    i = row_idx[cols[k]]
+                    val = float(cols[k + 1])
+                    if i >= 0:
+                        a_row.append(i)
+                        a_col.append(j)
+                        a_val.append(val)
+                    elif i == obj_row:
+                        obj_col.append(j)
+                        obj_val.append(val)
+            elif section == "ROWS":
+                op, tag = cols[0], cols[1]
+                if op == "N":
+                    if model.obj_name is None:
+                        model.obj_name = tag
+                        row_idx[tag] = obj_row
+                    else:
+                        row_idx[tag] = free_row
+                    continue
+                row_idx[tag] = len(model.row_names)
+                model.row_names.append(tag)
+                row_sense.append(op)
+                rhs.append(0.0)
+                ranges.append(np.nan)
+            elif section in ("RHS", "RANGES"):
+                # the set name is optional in free format
+                start = len(cols) % 2
+                name = cols[0] if start else ""
+                if set_name.setdefault(section, name) != name:
+                    continue
+                for k in range(start, len(cols) - 1, 2):
+                    i = row_idx[cols[k]]
+                    val = float(cols[k + 1])
+                    if section == "RANGES":
+                        if i >= 0:
+                            ranges[i] = val
+                    elif i >= 0:
+                        rhs[i] = val
+                    elif i == obj_row:
+                        model.obj_offset = -val
+            elif section == "BOUNDS":
+                # the set name is optional in free format and some
+                # writers put a value on FR, MI, PL and BV lines too
+                tag = cols[0]
+                has_val = tag not in ("FR", "MI", "PL", "BV")
+                if len(cols) == 4:
+                    name, var, val = cols[1:4]
+                elif len(cols) == 3 and has_val:
+                    name, var, val = "", cols[1], cols[2]
+                elif len(cols) == 3:
+                    name, var, val = cols[1], cols[2], None
+                else:
+                    name, var, val = "", cols[1], None
+                if set_name.setdefault(section, name) != name:
+                    continue
+                val = float(val) if has_val else 0.0
+                set_bound(tag, val, col_idx[var], col_lb, col_ub, col_int)
+            elif section == "OBJSENSE":
+                model.maximize = cols[0].startswith("MAX")
+
+    num_cols = len(model.col_names)
+    model.row_sense = np.array(row_sense, dtype="U1")
+    model.rhs = np.array(rhs)
+    model.ranges = np.array(ranges)
+    model.col_lb = np.array(col_lb)
+    model.col_ub = np.array(col_ub)
+    model.col_int = np.array(col_int, dtype=bool)
+    model.obj = np.zeros(num_cols)
+    model.obj[np.frombuffer(obj_col, dtype=np.int32)] = \
+        np.frombuffer(obj_val, dtype=np.float64)
+    model.a_row = np.frombuffer(a_row, dtype=np.int32)
+    model.a_col = np.frombuffer(a_col, dtype=np.int32)
+    model.a_val = np.frombuffer(a_val, dtype=np.float64)
+    return model
+
+
+def parse_mps_cached(filename, fixed=False, cache_path=None):
+    # the two formats can read the same file differently
+    kind = "mps-fixed" if fixed else "mps"
+    arrays, meta = snapshot.load_cached(
+        filename, kind, lambda f: parse_mps(f, fixed).to_snapshot(),
+        cache_path)
+    return MpsModel.from_snapshot(arrays, meta)
+
+
+def load_mps(model, solver):
+    infinity = solver.Infinity()
+    col_lb = np.maximum(model.col_lb, -infinity).tolist()
+    col_ub = np.minimum(model.col_ub, infinity).tolist()
+    col_int = model.col_int.tolist()
+    variables = [solver.Var(col_lb[j], col_ub[j], col_int[j], name)
+                 for j, name in enumerate(model.col_names)]
+
+    objective = solver.Objective()
+    for j in np.flatnonzero(model.obj).tolist():
+        objective.SetCoefficient(variables[j], model.obj[j])
+    objective.SetOffset(model.obj_offset)
+    if model.maximize:
+        objective.SetMaximization()
+    else:
+        objective.SetMinimization()
+
+    row_lb, row_ub = model.row_bounds(infinity)
+    row_lb = row_lb.tolist()
+    row_ub = row_ub.tolist()
+    constraints = [solver.Constraint(row_lb[i], row_ub[i], name)
+                   for i, name in enumerate(model.row_names)]
+    indptr, a_col, a_val = model.to_csr()
+    indptr = indptr.tolist()
+    a_col = a_col.tolist()
+    a_val = a_val.tolist()
+    for i, ct in enumerate(constraints):
+        for k in range(indptr[i], indptr[i + 1]):
+            ct.SetCoefficient(variables[a_col[k]], a_val[k])
+    return variables, constraints
+
+
+def read_mps(filename, solver, fixed=False):
+    return load_mps(parse_mps(filename, fixed), solver)
 
 
 def print_solver(solver):
@@ -95,8 +338,8 @@ def print_solver(solver):
 
 
 def run():
-    filename = "../data/mps/gr4x6.mps"
-    # filename = "../data/mps/bk4x3.mps"
+    filename = os.path.join(DATA_DIR, "gr4x6.mps")
+    # filename = os.path.join(DATA_DIR, "bk4x3.mps")
     solver = pywraplp.Solver("mps",
                              pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
     read_mps(filename, solver)
@@ -0,0 +1,83 @@
+import time
+
+import numpy as np
+
+from lp.mps import MpsModel
+from model.optimize_constraint import ReduceCache, optimize_constraints
+
+
+def binary_cols(model):
+    return model.col_int & (model.col_lb == 0) & (model.col_ub == 1)
+
+
+def knapsack_rows(model, max_len=20):
+    # rows over binary variables only, with integral data and no range
+    indptr, a_col, a_val = model.to_csr()
+    is_bin = binary_cols(model)
+    rows = []
+    for i in range(model.num_rows):
+        if model.row_sense[i] not in ("L", "G") or \
+                not np.isnan(model.ranges[i]):
+            continue
+        lo, hi = indptr[i], indptr[i + 1]
+        if hi - lo < 2 or hi - lo > max_len:
+            continue
+        cols = a_col[lo:hi]
+        vals = a_val[lo:hi]
+        if not is_bin[cols].all() or np.any(vals != np.round(vals)) \
+                or model.rhs[i] != np.round(model.rhs[i]):
+            continue
+        rows.append((i, cols, vals))
+    return rows
+
+
+def reduce_knapsack_rows(model, max_len=20, time_limit=10.0, cache=None):
+    if cache is None:
+        cache = ReduceCache()
+    deadline = time.time() + time_limit
+    new_rows = {}
+    num_cand = 0
+    for i, cols, vals in knapsack_rows(model, max_len):
+        num_cand += 1
+        if time.time() > deadline:
+            break
+        sign = 1 if model.row_sense[i] == "L" else -1
+        coef = (sign * vals).astype(int).tolist()
+        rhs = int(sign * model.rhs[i])
+        # a row that every 0-1 point satisfies carries no information
+        if sum(x for x in coef if x > 0) <= rhs:
+            continue
+        results, _ = optimize_constraints([(coef, rhs)], cache, workers=1)
+        bi, b0 = results[0]
+        new_rows[i] = (cols, np.array(bi), b0)
+
+    reduced = substitute_rows(model, new_rows)
+    stats = {
+        "candidates": num_cand,
+        "reduced": len(new_rows),
+        "cache_hits": cache.hits,
+    }
+    return reduced, stats
+
+
+def substitute_rows(model, new_rows):
+    reduced = MpsModel(model.name)
+    for name in ["obj_name", "maximize", "obj_offset", "row_names",
+                 "col_names", "col_lb", "col_ub", "col_int", "obj", "ranges"]:
+        setattr(reduced, name, getattr(model, name))
+    reduced.row_sense = model.row_sense.copy()
+    reduced.rhs = model.rhs.copy()
+    keep = ~np.isin(model.a_row, list(new_rows))
+    a_row = [model.a_row[keep]]
+    a_col = [model.a_col[keep]]
+    a_val = [model.a_val[keep]]
+    for i, (cols, bi, b0) in new_rows.items():
+        reduced.row_sense[i] = "L"
+        reduced.rhs[i] = b0
+        a_row.append(np.full(len(cols), i, dtype=np.int32))
+        a_col.append(cols.astype(np.int32))
+        a_val.append(bi.astype(float))
+    reduced.a_row = np.concatenate(a_row)
+    reduced.a_col = np.concatenate(a_col)
+    reduced.a_val = np.concatenate(a_val)
+    return reduced
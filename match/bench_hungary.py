@@ -0,0 +1,81 @@
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+from hungary import IncrementalAssignment, linear_assignment
+
+
+def bench(n, maximize=False, seed=0):
+    rng = np.random.default_rng(seed)
+    cost = rng.integers(0, 1000, size=(n, n)).astype(float)
+    start = time.time()
+    xm, _, _ = linear_assignment(cost, maximize)
+    sap_time = time.time() - start
+    start = time.time()
+    rows, cols = linear_sum_assignment(cost, maximize)
+    scipy_time = time.time() - start
+    total = cost[np.arange(n), xm].sum()
+    expect = cost[rows, cols].sum()
+    assert total == expect, (total, expect)
+    print("n=%-5d maximize=%-5s sap=%.4fs scipy=%.4fs total=%.0f" % (
+        n, maximize, sap_time, scipy_time, total))
+
+
+def bench_sparse(num_row, num_col, density, seed=0):
+    rng = np.random.default_rng(seed)
+    cost = sparse.random(num_row, num_col, density=density, format="csr",
+                         random_state=rng,
+                         data_rvs=lambda k: rng.integers(1, 1000, k))
+    start = time.time()
+    xm, dx, dy = linear_assignment(cost)
+    sap_time = time.time() - start
+    start = time.time()
+    rows, cols = min_weight_full_bipartite_matching(cost)
+    scipy_time = time.time() - start
+    total = cost[np.arange(num_row), xm].sum()
+    expect = cost[rows, cols].sum()
+    assert total == expect, (total, expect)
+    print("sparse %dx%d nnz=%d sap=%.4fs scipy=%.4fs total=%.0f" % (
+        num_row, num_col, cost.nnz, sap_time, scipy_time, total))
+
+
+def bench_incremental(n, k, updates=5, seed=0):
+    rng = np.random.default_rng(seed)
+    cost = rng.integers(0, 1000, size=(n, n)).astype(float)
+    inc = IncrementalAssignment(cost)
+    update_time = 0
+    full_time = 0
+    for _ in range(updates):
+        rows = rng.choice(n, size=k, replace=False)
+        values = rng.integers(0, 1000, size=(k, n))
+        cost[rows] = values
+        start = time.time()
+        inc.update_rows(rows, values)
+        update_time += time.time() - start
+        start = time.time()
+        xm, _, _ = linear_assignment(cost)
+        full_time += time.time() - start
+        assert inc.total() == cost[np.arange(n), xm].sum()
+    print("incremental n=%d k=%d update=%.4fs full=%.4fs speedup=%.1fx" % (
+        n, k, update_time / updates, full_time / updates,
+        full_time / update_time))
+
+
+def run():
+    for k in [1, 5, 20]:
+        bench_incremental(1000, k)
+    bench_sparse(300, 20000, 0.01)
+    sizes = [10, 50, 100, 500, 1000, 2000]
+    if len(sys.argv) > 1 and sys.argv[1] == "--full":
+        sizes.append(5000)
+    for n in sizes:
+        for maximize in [False, True]:
+            bench(n, maximize)
+
+
+if __name__ == '__main__':
+    run()
@@ -1,52 +1,261 @@
+import heapq
+
 import numpy as np
+from scipy import sparse
 
 
-def hungary(w):
-    n = len(w)
-    dx = np.zeros(n)
-    dy = np.zeros(n)
+def augment_row(cost, u, v, ym, root):
+    # Jonker-Volgenant style shortest augmenting path for one free row,
+    # the dual u[i] + v[j] <= cost[i][j] is kept feasible throughout;
+    # v and ym carry a virtual column m holding the row being inserted
+    m = cost.shape[1]
+    way = np.zeros(m + 1, dtype=int)
+    ym[m] = root
+    j0 = m
+    min_v = np.full(m + 1, np.inf)
+    used = np.zeros(m + 1, dtype=bool)
+    while True:
+        used[j0] = True
+        i0 = ym[j0]
+        free = ~used[:m]
+        reduced = cost[i0] - u[i0] - v[:m]
+        better = free & (reduced < min_v[:m])
+        min_v[:m][better] = reduced[better]
+        way[:m][better] = j0
+        slack = np.where(free, min_v[:m], np.inf)
+        j1 = int(np.argmin(slack))
+        delta = slack[j1]
+        if np.isinf(delta):
+            raise ValueError("cost matrix is infeasible")
+        u[ym[used]] += delta
+        v[used] -= delta
+        min_v[:m][free] -= delta
+        j0 = j1
+        if ym[j0] == -1:
+            break
+    # flip the alternating path back to the virtual column
+    while j0 != m:
+        j1 = way[j0]
+        ym[j0] = ym[j1]
+        j0 = j1
+    ym[m] = -1
+
+
+def row_matching(ym, n):
+    xm = np.full(n, -1, dtype=int)
+    matched = np.flatnonzero(ym >= 0)
+    xm[ym[matched]] = matched
+    return xm
+
+
+def shortest_augmenting_path(cost):
+    # O(n^3) assignment for n <= m rows and columns
+    n, m = cost.shape
+    u = np.zeros(n)
+    v = np.zeros(m + 1)
+    ym = np.full(m + 1, -1, dtype=int)
+    for i in range(n):
+        augment_row(cost, u, v, ym, i)
+    return row_matching(ym[:m], n), u, v[:m]
+
+
+def sparse_augment(indptr, indices, data, u, v, xm, ym, root, dist, final):
+    # Dijkstra from a free row over the stored entries only
+    pred = {}
+    touched = []
+    heap = []
+
+    def scan(i, d):
+        lo, hi = indptr[i], indptr[i + 1]
+        cols = indices[lo:hi]
+        nd = d + data[lo:hi] - u[i] - v[cols]
+        better = (nd < dist[cols]) & ~final[cols]
+        for j, dj in zip(cols[better].tolist(), nd[better].tolist()):
+            if np.isinf(dist[j]):
+                touched.append(j)
+            dist[j] = dj
+            pred[j] = i
+            heapq.heappush(heap, (dj, j))
+
+    scan(root, 0.0)
+    done = []
+    sink = -1
+    while heap:
+        d, j = heapq.heappop(heap)
+        if final[j] or d > dist[j]:
+            continue
+        final[j] = True
+        done.append(j)
+        if ym[j] == -1:
+            sink = j
+            break
+        scan(ym[j], d)
+    if sink == -1:
+        raise ValueError("cost matrix is infeasible")
+
+    total = dist[sink]
+    u[root] += total
+    for j in done:
+        if j != sink:
+            v[j] -= total - dist[j]
+            u[ym[j]] += total - dist[j]
+    j = sink
+    while True:
+        i = pred[j]
+        next_j = xm[i]
+        ym[j] = i
+        xm[i] = j
+        if i == root:
+            break
+        j = next_j
+    dist[touched] = np.inf
+    final[touched] = False
+
+
+def sparse_shortest_augmenting_path(cost):
+    # forbidden pairs are the entries missing from the CSR matrix
+    n, m = cost.shape
+    indptr = cost.indptr
+    indices = cost.indices
+    data = cost.data.astype(float)
+    u = np.zeros(n)
+    v = np.zeros(m)
+    xm = np.full(n, -1, dtype=int)
+    ym = np.full(m, -1, dtype=int)
+    dist = np.full(m, np.inf)
+    final = np.zeros(m, dtype=bool)
     for i in range(n):
-        dx[i] = max(w[i])
-
-    ym = np.zeros(n, dtype=int) - 1
-    row = set()
-    col = set()
-    max_num = 1e10
-
-    def augment(x):
-        row.add(x)
-        for y in range(n):
-            if y in col:
-                continue
-            t = dx[x] + dy[y] - w[x][y]
-            if t == 0:
-                col.add(y)
-                if ym[y] == -1 or augment(ym[y]):
-                    ym[y] = x
-                    return True
-        return False
-
-    def find_delta():
-        d = max_num
-        for s in row:
-            for t in range(n):
-                if t in col:
-                    continue
-                d = min(dx[s] + dy[t] - w[s][t], d)
-        return d
-
-    for xx in range(n):
-        while True:
-            row.clear()
-            col.clear()
-            if augment(xx):
-                break
-            # print((dx - w.T).T + dy)
-            delta = find_delta()
-            for i in row:
-                dx[i] -= delta
-            for j in col:
-                dy[j] += delta
+        sparse_augment(indptr, indices, data, u, v, xm, ym, i, dist, final)
+    return xm, u, v
+
+
+def linear_assignment(cost, maximize=False):
+    # returns the column matched to each row (-1 if unmatched) and the
+    # duals with dx[i] + dy[j] <= cost[i][j] (>= when maximizing)
+    if sparse.issparse(cost):
+        cost = sparse.csr_matrix(cost, dtype=float)
+        cost.sum_duplicates()
+        solve = sparse_shortest_augmenting_path
+    else:
+        cost = np.asarray(cost, dtype=float)
+        solve = shortest_augmenting_path
+    if maximize:
+        cost = -cost
+    n, m = cost.shape
+    if n <= m:
+        xm, dx, dy = solve(cost)
+    else:
+        cost_t = cost.T.tocsr() if sparse.issparse(cost) \
+            else np.ascontiguousarray(cost.T)
+        ym, dy, dx = solve(cost_t)
+        xm = np.full(n, -1, dtype=int)
+        xm[ym] = np.arange(m)
+    if maximize:
+        dx, dy = -dx, -dy
+    return xm, dx, dy
+
+
+class IncrementalAssignment(object):
+    # dense assignment that repairs the previous optimum after a few rows
+    # or columns change instead of solving from scratch
+    def __init__(self, cost, maximize=False):
+        cost = np.array(cost, dtype=float)
+        self.sign = -1 if maximize else 1
+        self.transposed = cost.shape[0] > cost.shape[1]
+        if self.transposed:
+            cost = cost.T.copy()
+        self.cost = self.sign * cost
+        n, m = self.cost.shape
+        self.u = np.zeros(n)
+        self.v = np.zeros(m + 1)
+        self.ym = np.full(m + 1, -1, dtype=int)
+        self.xm = np.full(n, -1, dtype=int)
+        self.augment_free()
+
+    def augment_free(self):
+        for i in np.flatnonzero(self.xm == -1).tolist():
+            augment_row(self.cost, self.u, self.v, self.ym, i)
+        self.xm = row_matching(self.ym[:-1], len(self.xm))
+
+    def free_row(self, i):
+        j = self.xm[i]
+        if j >= 0:
+            self.ym[j] = -1
+            self.xm[i] = -1
+        return j
+
+    def repair_free_cols(self, eps=1e-9):
+        # with more columns than rows an unmatched column needs v = 0,
+        # lifting it frees the rows whose dual would become infeasible
+        n, m = self.cost.shape
+        if n == m:
+            return
+        queue = np.flatnonzero((self.ym[:m] == -1) & (self.v[:m] < 0)).tolist()
+        while queue:
+            j = queue.pop()
+            self.v[j] = 0
+            slack = self.cost[:, j] - self.u
+            for i in np.flatnonzero((slack < -eps) & (self.xm >= 0)).tolist():
+                jr = self.free_row(i)
+                if self.v[jr] < 0:
+                    queue.append(jr)
+
+    def set_rows(self, rows, values):
+        self.cost[rows] = self.sign * np.asarray(values, dtype=float)
+        for i in np.atleast_1d(rows).tolist():
+            self.free_row(i)
+
+    def set_cols(self, cols, values):
+        self.cost[:, cols] = self.sign * np.asarray(values, dtype=float)
+        n, m = self.cost.shape
+        matched = self.xm >= 0
+        for j in np.atleast_1d(cols).tolist():
+            i = self.ym[j]
+            if i >= 0:
+                self.free_row(i)
+                matched[i] = False
+            slack = self.cost[matched, j] - self.u[matched]
+            self.v[j] = slack.min(initial=0 if n < m else np.inf)
+            if np.isinf(self.v[j]):
+                self.v[j] = 0
+
+    def update_rows(self, rows, values):
+        if self.transposed:
+            self.set_cols(rows, np.asarray(values).T)
+        else:
+            self.set_rows(rows, values)
+        self.repair_free_cols()
+        self.augment_free()
+
+    def update_cols(self, cols, values):
+        if self.transposed:
+            self.set_rows(cols, np.asarray(values).T)
+        else:
+            self.set_cols(cols, values)
+        self.repair_free_cols()
+        self.augment_free()
+
+    def matching(self):
+        if not self.transposed:
+            return self.xm.copy()
+        xm = np.full(self.cost.shape[1], -1, dtype=int)
+        xm[self.xm] = np.arange(len(self.xm))
+        return xm
+
+    def duals(self):
+        u = self.sign * self.u
+        v = self.sign * self.v[:-1]
+        return (v, u) if self.transposed else (u, v)
+
+    def total(self):
+        rows = np.arange(len(self.xm))
+        return self.sign * self.cost[rows, self.xm].sum()
+
+
+def hungary(w):
+    xm, _, _ = linear_assignment(w, maximize=True)
+    ym = np.zeros(len(xm), dtype=int)
+    ym[xm] = np.arange(len(xm))
     return ym
 
 
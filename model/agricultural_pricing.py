@@ -2,96 +2,259 @@ import numpy as np
 import osqp
 from scipy import sparse
 
+PRODUCT_NAME = ["milk", "butter", "cheese1", "cheese2"]
+# percentage of fat, dry matter and water
+COMPOSITIONS = [
+    [4, 9, 87],
+    [80, 2, 18],
+    [35, 30, 35],
+    [25, 40, 35],
+]
+# yearly supply of fat and dry matter
+COMPONENT_LIMIT = [600, 750]
+LAST_DEMAND = [4820, 320, 210, 70]
+LAST_PRICE = [0.297, 0.720, 1.050, 0.815]
+ELASTICITIES = [0.4, 2.7, 1.1, 0.4]
+# CROSS_ELASTICITIES[i, k] is the elasticity of demand i to price k
+CROSS_ELASTICITIES = sparse.csr_matrix(
+    ([0.1, 0.4], ([2, 3], [3, 2])), shape=(4, 4))
 
-def run():
-    product_name = ["milk", "butter", "cheese1", "cheese2"]
-    num_product = len(product_name)
-    compositions = [
-        [4, 9, 87],
-        [80, 2, 18],
-        [35, 30, 35],
-        [25, 40, 35],
-    ]
-    last_demand = [4820, 320, 210, 70]
-    last_price = [0.297, 0.720, 1.050, 0.815]
-    elasticities = [0.4, 2.7, 1.1, 0.4]
-    cross_elasticities = [0.1, 0.4]
-
-    def get_price_ratio(p, idx):
-        return (p - last_price[idx]) / last_price[idx]
-
-    def get_demand_by_price(p, idx):
-        ratio = get_price_ratio(p, idx) * elasticities[idx]
-        return last_demand[idx] * (1 - ratio)
-
-    def get_demand_milk(p):
-        return get_demand_by_price(p, 0)
-
-    def get_demand_butter(p):
-        return get_demand_by_price(p, 1)
-
-    def get_demand_cheese1(p1, p2):
-        idx = 2
-        ratio = get_price_ratio(p1, idx) * elasticities[idx] \
-                - get_price_ratio(p2, 3) * cross_elasticities[0]
-        return last_demand[idx] * (1 - ratio)
-
-    def get_demand_cheese2(p1, p2):
-        idx = 3
-        ratio = get_price_ratio(p2, idx) * elasticities[idx] \
-                - get_price_ratio(p1, 2) * cross_elasticities[1]
-        return last_demand[idx] * (1 - ratio)
-
-    def get_demands(prices):
-        return [
-            get_demand_milk(prices[0]),
-            get_demand_butter(prices[1]),
-            get_demand_cheese1(prices[2], prices[3]),
-            get_demand_cheese2(prices[2], prices[3]),
+
+def generate_market(num_products, num_components=2, num_cross=3,
+                    category_size=10, seed=0):
+    # products are substitutes within categories of category_size, the
+    # cross elasticities are scaled down until every product's own slope
+    # outweighs its cross slopes so the revenue stays concave
+    rng = np.random.default_rng(seed)
+    last_demand = rng.uniform(10, 5000, num_products)
+    last_price = rng.uniform(0.2, 2.0, num_products)
+    elasticities = rng.uniform(0.3, 3.0, num_products)
+    row = np.repeat(np.arange(num_products), num_cross)
+    first = row - row % category_size
+    size = np.minimum(category_size, num_products - first)
+    col = first + (row - first + rng.integers(1, np.maximum(size, 2),
+                                              len(row))) % size
+    keep = col != row
+    row = row[keep]
+    col = col[keep]
+    cross = sparse.coo_matrix(
+        (rng.uniform(0.05, 0.5, len(row)), (row, col)),
+        shape=(num_products, num_products)).tocsr().tocoo()
+    own, _, _, cross_slope = demand_slopes(last_demand, last_price,
+                                           elasticities, cross)
+    spread = np.bincount(cross.row, cross_slope, num_products) + \
+        np.bincount(cross.col, cross_slope, num_products)
+    scale = np.minimum(1, 1.8 * own / np.maximum(spread, 1e-12))
+    cross.data *= np.minimum(scale[cross.row], scale[cross.col])
+    compositions = rng.dirichlet(np.ones(num_components + 1),
+                                 num_products) * 100
+    # supply a bit short of what the last demand used
+    limits = 0.9 * (compositions[:, :num_components].T / 100).dot(
+        last_demand)
+    return last_demand, last_price, elasticities, cross, compositions, limits
+
+
+class CscPattern(object):
+    # a fixed sparsity pattern, matrix(values) lays out values given per
+    # (row, col) entry as csc data so the structure never changes between
+    # updates, duplicate entries are summed and zeros stay explicit
+    def __init__(self, rows, cols, shape):
+        keys = np.asarray(cols, dtype=np.int64) * shape[0] + rows
+        keys, self.inverse = np.unique(keys, return_inverse=True)
+        self.indices = (keys % shape[0]).astype(np.int32)
+        self.indptr = np.searchsorted(
+            keys // shape[0], np.arange(shape[1] + 1)).astype(np.int32)
+        self.shape = shape
+
+    def data(self, values):
+        return np.bincount(self.inverse, weights=values,
+                           minlength=len(self.indices))
+
+    def matrix(self, values):
+        return sparse.csc_matrix(
+            (self.data(values), self.indices, self.indptr), shape=self.shape)
+
+
+def demand_slopes(last_demand, last_price, elasticities, cross):
+    # linear demand d = a + B p through the last observed point, own[i] is
+    # -B[i, i] and cross.data the off-diagonal entries of B
+    own = last_demand * elasticities / last_price
+    cross = sparse.coo_matrix(cross)
+    cross_slope = last_demand[cross.row] * cross.data / last_price[cross.col]
+    return own, cross.row, cross.col, cross_slope
+
+
+class PricingModel(object):
+    # revenue p.d with linear demand d = a + B p is maximized by the QP
+    #   min 0.5 p' P p + q' p,  P = -(B + B'), q = -a
+    # over the rows
+    #   component use of d within the limits
+    #   price index of p at most index_limit
+    #   d >= 0 and p >= 0
+    # P and A are built once, market updates that keep the slopes B only
+    # change q, l and u, so osqp reuses its factorization and warm starts
+    # from the last solution
+    def __init__(self, last_demand, last_price, elasticities, cross,
+                 compositions, limits, index_limit=None, **settings):
+        self.last_demand = np.asarray(last_demand, dtype=float)
+        self.last_price = np.asarray(last_price, dtype=float)
+        n = len(self.last_demand)
+        self.num_products = n
+        self.limits = np.asarray(limits, dtype=float)
+        # share of each limited component in each product
+        self.share = np.asarray(compositions, dtype=float)[
+            :, :len(self.limits)].T / 100
+        num_comp = len(self.limits)
+        # laspeyres weights from the base demand
+        self.index_weight = self.last_demand / 1000
+        # a limit given at setup stays, otherwise it follows the base prices
+        self.given_index_limit = index_limit
+        self.index_limit = self.index_weight.dot(self.last_price) \
+            if index_limit is None else index_limit
+
+        cross = sparse.coo_matrix(cross)
+        self.elasticities = np.asarray(elasticities, dtype=float)
+        self.cross_elasticity = cross.data
+        own, cross_row, cross_col, cross_slope = demand_slopes(
+            self.last_demand, self.last_price, self.elasticities, cross)
+        self.cross_row = cross_row
+        self.cross_col = cross_col
+
+        self.set_slopes(own, cross_slope)
+        rows, cols, p_values = self.p_entries()
+        self.p_pattern = CscPattern(rows, cols, (n, n))
+        rows, cols, a_values = self.a_entries()
+        self.a_pattern = CscPattern(rows, cols, (num_comp + 1 + 2 * n, n))
+
+        self.prob = osqp.OSQP()
+        q, l, u = self.vectors()
+        self.prob.setup(self.p_pattern.matrix(p_values), q,
+                        self.a_pattern.matrix(a_values), l, u, **settings)
+        self.result = None
+
+    @classmethod
+    def default(cls, **settings):
+        return cls(LAST_DEMAND, LAST_PRICE, ELASTICITIES, CROSS_ELASTICITIES,
+                   COMPOSITIONS, COMPONENT_LIMIT, **settings)
+
+    def set_slopes(self, own, cross_slope):
+        self.own = own
+        self.cross_slope = cross_slope
+        b = sparse.csr_matrix(
+            (cross_slope, (self.cross_row, self.cross_col)),
+            shape=(self.num_products,) * 2) - sparse.diags(own)
+        self.slope = b
+        self.intercept = self.last_demand - b.dot(self.last_price)
+
+    def p_entries(self):
+        # upper triangle of P
+        diag = np.arange(self.num_products)
+        rows = np.minimum(self.cross_row, self.cross_col)
+        cols = np.maximum(self.cross_row, self.cross_col)
+        return np.concatenate([diag, rows]), np.concatenate([diag, cols]), \
+            np.concatenate([2 * self.own, -self.cross_slope])
+
+    def a_entries(self):
+        # rows: components (-share.B), price index, demand (-B), price
+        n = self.num_products
+        num_comp = len(self.limits)
+        diag = np.arange(n)
+        comp = np.arange(num_comp)[:, None]
+        blocks = [
+            np.broadcast_arrays(comp, diag, self.share * self.own),
+            np.broadcast_arrays(comp, self.cross_col,
+                                -self.share[:, self.cross_row] *
+                                self.cross_slope),
+            (np.full(n, num_comp), diag, self.index_weight),
+            (num_comp + 1 + diag, diag, self.own),
+            (num_comp + 1 + self.cross_row, self.cross_col,
+             -self.cross_slope),
+            (num_comp + 1 + n + diag, diag, np.ones(n)),
         ]
+        return [np.concatenate([np.ravel(b[k]) for b in blocks])
+                for k in range(3)]
+
+    def vectors(self):
+        n = self.num_products
+        a = self.intercept
+        l = np.concatenate([self.share.dot(a) - self.limits, [0],
+                            np.full(n, -np.inf), np.zeros(n)])
+        u = np.concatenate([np.full(len(self.limits), np.inf),
+                            [self.index_limit], a, np.full(n, np.inf)])
+        return -a, l, u
+
+    def update(self, last_demand=None, last_price=None, limits=None,
+               index_limit=None):
+        # moves the demand curves through the new observed point keeping
+        # their slopes and the price index weights, only the vectors
+        # change; update_market takes them at the new point instead
+        if last_demand is not None:
+            self.last_demand = np.asarray(last_demand, dtype=float)
+        if last_price is not None:
+            self.last_price = np.asarray(last_price, dtype=float)
+        if limits is not None:
+            self.limits = np.asarray(limits, dtype=float)
+        if index_limit is not None:
+            self.index_limit = index_limit
+        self.intercept = self.last_demand - self.slope.dot(self.last_price)
+        q, l, u = self.vectors()
+        self.prob.update(q=q, l=l, u=u)
+
+    def update_elasticities(self, elasticities, cross=None):
+        # new slopes at the last observed point, cross needs the pattern
+        # given at setup; P and A keep their structure but osqp has to
+        # refactorize
+        if cross is not None:
+            self.cross_elasticity = sparse.coo_matrix(cross).data
+        self.elasticities = np.asarray(elasticities, dtype=float)
+        self.refactor()
 
-    def print_result():
-        print("Product", *product_name, sep="\t")
-        p_out = ["%.4f" % x for x in price_opt]
-        print("Price ", *p_out, sep="\t")
-        d_out = ["%.2f" % x for x in demand_opt]
-        print("Demand", *d_out, sep="\t")
-        total = sum(price_opt[i] * demand_opt[i] for i in range(num_product))
-        print("Total = %f" % total)
-
-    price_opt = solve_qp()
-    demand_opt = get_demands(price_opt)
-    print_result()
-
-
-def solve_qp():
-    p_mat = sparse.csc_matrix([
-        [-6492, 0, 0, 0],
-        [0, -1200, 0, 0],
-        [0, 0, -220, 26.5],
-        [0, 0, 26.5, -34],
-    ])
-    p_mat = -2 * p_mat
-    p_vec = -np.array([6748, 1184, 420, 70])
-    a_mat = sparse.csc_matrix([
-        [260, 960, 70.25, -0.6],
-        [584, 24, 55.2, 5.8],
-        [4.82, 0.32, 0.21, 0.07],
-        [0, 0, 220, -26],
-        [0, 0, -27, 34],
-        [1, 0, 0, 0],
-        [0, 1, 0, 0],
-        [0, 0, 1, 0],
-        [0, 0, 0, 1],
-    ])
-    eps = 0
-    lb = np.array([782, 35, eps, -np.inf, -np.inf, eps, eps, eps, eps])
-    ub = np.array([np.inf, np.inf, 1.939, 420, 70, 1.039, 0.987, np.inf, np.inf])
-
-    prob = osqp.OSQP()
-    prob.setup(p_mat, p_vec, a_mat, lb, ub)
-    res = prob.solve()
-    return res.x
+    def update_market(self, last_demand=None, last_price=None,
+                      elasticities=None):
+        # a new base observation, the slopes, the price index weights and
+        # a limit not given at setup are taken at it as a fresh setup would,
+        # at the cost of a refactorization
+        if last_demand is not None:
+            self.last_demand = np.asarray(last_demand, dtype=float)
+        if last_price is not None:
+            self.last_price = np.asarray(last_price, dtype=float)
+        if elasticities is not None:
+            self.elasticities = np.asarray(elasticities, dtype=float)
+        self.index_weight = self.last_demand / 1000
+        if self.given_index_limit is None:
+            self.index_limit = self.index_weight.dot(self.last_price)
+        self.refactor()
+
+    def refactor(self):
+        own, _, _, cross_slope = demand_slopes(
+            self.last_demand, self.last_price, self.elasticities,
+            sparse.coo_matrix((self.cross_elasticity,
+                               (self.cross_row, self.cross_col)),
+                              shape=(self.num_products,) * 2))
+        self.set_slopes(own, cross_slope)
+        q, l, u = self.vectors()
+        self.prob.update(q=q, l=l, u=u,
+                         Px=self.p_pattern.data(self.p_entries()[2]),
+                         Ax=self.a_pattern.data(self.a_entries()[2]))
+
+    def solve(self):
+        self.result = self.prob.solve()
+        return self.result.x
+
+    def demand(self, prices):
+        return self.intercept + self.slope.dot(prices)
+
+
+def run():
+    model = PricingModel.default()
+    price_opt = model.solve()
+    demand_opt = model.demand(price_opt)
+    print("Product", *PRODUCT_NAME, sep="\t")
+    p_out = ["%.4f" % x for x in price_opt]
+    print("Price ", *p_out, sep="\t")
+    d_out = ["%.2f" % x for x in demand_opt]
+    print("Demand", *d_out, sep="\t")
+    print("Total = %f" % price_opt.dot(demand_opt))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,61 @@
+import argparse
+import math
+import time
+
+from ortools.linear_solver import pywraplp
+
+from lp.builder import ModelBuilder
+from lp.mps import load_mps
+from model import economy, farm, milk_collection
+from model.milk_routing import generate_instance
+from util.distance import DistanceMatrix
+
+
+def build_economy(builder, scale):
+    economy.build_model(builder, num_years=economy.NUM_YEARS * scale,
+                        final_product=[0, 0, 0])
+
+
+def build_farm(builder, scale):
+    params = farm.FarmParams()
+    farm.build_model(builder, params.replace(num_year=params.num_year * scale))
+
+
+def build_milk(builder, scale):
+    # the arc variables grow with the square of the farms
+    num_farms = int(round(len(milk_collection.FARM_COLLECTION) *
+                          math.sqrt(scale)))
+    inst = generate_instance(num_farms)
+    dist = DistanceMatrix.from_points(inst.east, inst.north)
+    milk_collection.build_mip(builder, dist, inst.collection,
+                              inst.num_everyday, inst.capacity)
+
+
+def bench(name, build, scale):
+    builder = ModelBuilder(name, names=False)
+    start = time.time()
+    build(builder, scale)
+    model = builder.to_mps_model()
+    build_time = time.time() - start
+    solver = pywraplp.Solver(name,
+                             pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
+    start = time.time()
+    load_mps(model, solver)
+    load_time = time.time() - start
+    print("%s x%d cols=%d rows=%d nnz=%d build=%.3fs load=%.3fs" % (
+        name, scale, model.num_cols, model.num_rows, model.num_nonzeros,
+        build_time, load_time))
+
+
+def run():
+    parser = argparse.ArgumentParser(description="Model build time")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+    for name, build in [("economy", build_economy), ("farm", build_farm),
+                        ("milk_collection", build_milk)]:
+        for scale in args.scales:
+            bench(name, build, scale)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,91 @@
+import argparse
+import contextlib
+import io
+import os
+import time
+import warnings
+
+import numpy as np
+
+from model import efficiency_analysis
+from model.dea import generate_units, solve_dea, solve_dea_glop
+
+
+def solve_loop(inputs, outputs):
+    # the per-unit copy and cold solve of efficiency_analysis.run
+    theta = np.full(len(inputs), np.nan)
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for j in range(len(inputs)):
+            ret = efficiency_analysis.optimize_efficiency(
+                inputs[j], outputs[j], np.delete(inputs, j, axis=0),
+                np.delete(outputs, j, axis=0))
+            if ret.status == 0:
+                theta[j] = ret.x[-1]
+    return theta
+
+
+def same_result(a, b):
+    solved = ~a.efficient
+    return np.array_equal(a.efficient, b.efficient) and \
+        np.allclose(a.theta[solved], b.theta[solved], atol=1e-6)
+
+
+def bench(name, inputs, outputs, workers, loop_max):
+    n = len(inputs)
+    if n <= loop_max:
+        start = time.time()
+        theta = solve_loop(inputs, outputs)
+        print("%s n=%d loop time=%.2fs" % (name, n, time.time() - start))
+    else:
+        theta = None
+    for w in sorted(set([1, workers])):
+        start = time.time()
+        result = solve_dea(inputs, outputs, workers=w)
+        elapsed = time.time() - start
+        if w == 1:
+            highs_time = elapsed
+        print("%s n=%d highs workers=%d efficient=%d peers=%d time=%.2fs" % (
+            name, n, w, result.efficient.sum(), result.lambdas.nnz, elapsed))
+    if theta is not None:
+        same = np.array_equal(np.isnan(theta), result.efficient) and \
+            np.allclose(theta[~result.efficient],
+                        result.theta[~result.efficient], atol=1e-6)
+        print("%s n=%d matches loop: %s" % (name, n, same))
+
+    for screen, scores in [(False, True), (True, True), (True, False)]:
+        start = time.time()
+        glop = solve_dea_glop(inputs, outputs, screen, scores)
+        elapsed = time.time() - start
+        stats = glop.stats
+        if scores:
+            same = same_result(result, glop)
+        else:
+            same = np.array_equal(glop.efficient, result.efficient)
+        mode = "glop" + (" screen" if screen else "") + \
+            ("" if scores else " classify")
+        print("%s n=%d %s lps=%d skipped=%d time=%.2fs speedup=%.1fx "
+              "matches: %s" % (name, n, mode, stats["lps"], stats["skipped"],
+                               elapsed, highs_time / elapsed, same))
+    print("%s n=%d screened efficient=%d dominated=%d reference=%d" % (
+        name, n, stats["screened_efficient"], stats["screened_dominated"],
+        stats["reference"]))
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        description="Batched HiGHS and warm-started GLOP DEA")
+    parser.add_argument("-n", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--loop-max", type=int, default=1000,
+                        help="largest size the per-unit loop still runs on")
+    args = parser.parse_args()
+    bench("garage", efficiency_analysis.GARAGE_INPUTS,
+          efficiency_analysis.GARAGE_OUTPUTS, args.workers, args.loop_max)
+    for n in args.n:
+        inputs, outputs = generate_units(n)
+        bench("random", inputs, outputs, args.workers, args.loop_max)
+
+
+if __name__ == '__main__':
+    run()
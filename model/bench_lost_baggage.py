@@ -0,0 +1,61 @@
+import argparse
+import contextlib
+import io
+import time
+
+from model import lost_baggage
+
+
+def timed(func, *args, **kwargs):
+    start = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return result, time.time() - start
+
+
+def bench_mip(label, **kwargs):
+    # the subtour loop stops after 10 rounds or at the time limit, its
+    # paths are only a solution when no van has more than one
+    (obj, paths), mip_time = timed(lost_baggage.run_mip, **kwargs)
+    valid = bool(paths) and all(len(p) <= 1 for p in paths.values())
+    print("%s mip eta=%.0f time=%.2fs valid=%s" % (
+        label, obj, mip_time, valid))
+
+
+def bench_bundled(num_vans):
+    label = "bundled vans=%d" % num_vans
+    bench_mip(label, num_vans=num_vans)
+    for name, solve in [("circuit", lost_baggage.solve_circuit),
+                        ("minmax", lost_baggage.solve_minmax)]:
+        (obj, _, status), solve_time = timed(solve, num_vans=num_vans)
+        print("%s %s eta=%d time=%.2fs %s" % (
+            label, name, obj, solve_time, status))
+
+
+def bench_random(num_airports, num_vans, time_limit):
+    eta = lost_baggage.generate_eta(num_airports)
+    eta_limit = int(eta.data.max()) * num_airports
+    label = "random n=%d vans=%d" % (num_airports, num_vans)
+    instance = {"eta": eta, "num_vans": num_vans, "eta_limit": eta_limit,
+                "time_limit": time_limit}
+    bench_mip(label, **instance)
+    for name, solve in [("circuit", lost_baggage.solve_circuit),
+                        ("minmax", lost_baggage.solve_minmax)]:
+        (obj, _, status), solve_time = timed(solve, **instance)
+        print("%s %s eta=%d time=%.2fs %s" % (
+            label, name, obj, solve_time, status))
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        description="Lost baggage min-max routing formulations")
+    parser.add_argument("-t", "--time-limit", type=float, default=60)
+    args = parser.parse_args()
+    for num_vans in [2, 3]:
+        bench_bundled(num_vans)
+    for num_airports, num_vans in [(15, 2), (30, 4), (50, 6)]:
+        bench_random(num_airports, num_vans, args.time_limit)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,52 @@
+import argparse
+import contextlib
+import io
+import time
+
+from model import milk_collection
+from model.milk_routing import MilkInstance, generate_instance, solve_routing
+
+TIME_LIMITS = {21: 5, 100: 10, 500: 30, 2000: 60}
+
+
+def bench_mip():
+    start = time.time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        dist, _ = milk_collection.run_mip()
+    print("n=21 mip dist=%.3f time=%.2fs" % (dist, time.time() - start))
+    start = time.time()
+    dist, _, _ = milk_collection.solve_circuit()
+    print("n=21 circuit dist=%.3f time=%.2fs" % (dist, time.time() - start))
+
+
+def bench_routing(name, inst, time_limit, first_solution):
+    for local_search in ["GREEDY_DESCENT", "GUIDED_LOCAL_SEARCH"]:
+        start = time.time()
+        dist, routes = solve_routing(inst, first_solution, local_search,
+                                     time_limit)
+        used = sum(1 for day in routes for route in day if route)
+        print("%s vehicles=%d/%d %s dist=%.3f time=%.2fs" % (
+            name, used, inst.num_vehicles * inst.num_day, local_search, dist,
+            time.time() - start))
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        description="Milk collection routing against the MIP")
+    parser.add_argument("-n", type=int, nargs="+",
+                        default=sorted(TIME_LIMITS))
+    parser.add_argument("--first-solution",
+                        default="PARALLEL_CHEAPEST_INSERTION")
+    args = parser.parse_args()
+    for n in args.n:
+        time_limit = TIME_LIMITS.get(n, 30)
+        if n == 21:
+            bench_mip()
+            inst = MilkInstance.default()
+        else:
+            inst = generate_instance(n)
+        bench_routing("n=%d" % n, inst, time_limit, args.first_solution)
+
+
+if __name__ == '__main__':
+    run()
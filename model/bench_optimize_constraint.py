@@ -0,0 +1,47 @@
+import random
+import time
+
+# imported up front so the first highs solve does not pay for it
+import scipy.optimize  # noqa: F401
+
+from model.optimize_constraint import (reduce_matrix, solve_reduce_matrix,
+                                       solve_reduce_prob)
+from util import reduce
+
+
+def bench_row(name, a, a0):
+    start = time.time()
+    ceilings = list(reduce.iter_ceilings(a, a0))
+    roofs = list(reduce.iter_roofs(a, a0))
+    enum_time = time.time() - start
+
+    start = time.time()
+    expr = solve_reduce_prob(len(a), [reduce.to_list(m) for m in ceilings],
+                             [reduce.to_list(m) for m in roofs], a0)
+    expr_time = time.time() - start
+
+    start = time.time()
+    a_ub, b_ub = reduce_matrix(len(a), ceilings, roofs)
+    build_time = time.time() - start
+    times = {}
+    for backend in ["clp", "highs"]:
+        start = time.time()
+        coef, rhs = solve_reduce_matrix(a_ub, b_ub, a0, backend)
+        times[backend] = time.time() - start
+        assert abs(sum(coef) - sum(expr[0])) < 1e-6
+    print("%s n=%d roofs=%d ceilings=%d enum=%.3fs expr=%.3fs "
+          "matrix=%.3fs clp=%.3fs highs=%.3fs" % (
+              name, len(a), len(roofs), len(ceilings), enum_time, expr_time,
+              build_time, times["clp"], times["highs"]))
+
+
+def run():
+    bench_row("test2", [23, 21, 19, 17, 14, 13, 13, 9], 70)
+    rng = random.Random(0)
+    for n in [12, 16, 20, 24]:
+        a = sorted((rng.randint(1, 100) for _ in range(n)), reverse=True)
+        bench_row("random[%d]" % n, a, sum(a) // 3)
+
+
+if __name__ == '__main__':
+    run()
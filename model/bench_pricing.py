@@ -0,0 +1,70 @@
+import argparse
+import time
+
+import numpy as np
+
+from model.agricultural_pricing import PricingModel, generate_market
+
+SETTINGS = {"verbose": False}
+
+
+def bench(n, num_updates, num_cold, seed=1):
+    data = generate_market(n)
+    last_demand = data[0]
+    start = time.time()
+    model = PricingModel(*data, **SETTINGS)
+    model.solve()
+    print("n=%d setup+solve=%.4fs iter=%d %s" % (
+        n, time.time() - start, model.result.info.iter,
+        model.result.info.status))
+
+    # each market update moves the observed demand by a few percent
+    rng = np.random.default_rng(seed)
+    demands = [last_demand * rng.uniform(0.97, 1.03, n)
+               for _ in range(num_updates)]
+    latency = []
+    iters = []
+    prices = []
+    for demand in demands:
+        start = time.time()
+        model.update(last_demand=demand)
+        prices.append(model.solve())
+        latency.append(time.time() - start)
+        iters.append(model.result.info.iter)
+    print("n=%d warm update mean=%.4fs median=%.4fs iter=%.1f" % (
+        n, np.mean(latency), np.median(latency), np.mean(iters)))
+
+    # the same updates on a fresh setup each time
+    cold = []
+    diff = 0.0
+    for demand, price in list(zip(demands, prices))[:num_cold]:
+        start = time.time()
+        fresh = PricingModel(*data, **SETTINGS)
+        fresh.update(last_demand=demand)
+        diff = max(diff, np.abs(fresh.solve() - price).max())
+        cold.append(time.time() - start)
+    if cold:
+        print("n=%d cold setup+solve mean=%.4fs speedup=%.1fx "
+              "max price diff=%.2e" % (n, np.mean(cold),
+                                       np.mean(cold) / np.mean(latency), diff))
+
+    start = time.time()
+    model.update_elasticities(data[2] * 1.05)
+    model.solve()
+    print("n=%d elasticity update with refactorization=%.4fs" % (
+        n, time.time() - start))
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        description="Pricing QP latency per market update")
+    parser.add_argument("-n", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--updates", type=int, default=50)
+    parser.add_argument("--cold", type=int, default=5)
+    args = parser.parse_args()
+    for n in args.n:
+        bench(n, args.updates, args.cold)
+
+
+if __name__ == '__main__':
+    run()
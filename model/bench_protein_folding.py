@@ -0,0 +1,58 @@
+import argparse
+import time
+
+import numpy as np
+
+from model.protein_folding import (SEQUENCES, check_folds, fold_dp,
+                                   solve_fold_model)
+
+
+def random_sequence(num_acids, share=0.5, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.flatnonzero(rng.random(num_acids) < share) + 1
+
+
+def bench(name, num_acids, hydrophobic_acids, mip_max, time_limit):
+    hydrophobic_acids = [int(i) for i in hydrophobic_acids]
+    start = time.time()
+    objective, folds = fold_dp(num_acids, hydrophobic_acids)
+    dp_time = time.time() - start
+    valid = check_folds(num_acids, hydrophobic_acids, folds) == objective
+    print("%s n=%d dp objective=%d folds=%d time=%.4fs valid=%s" % (
+        name, num_acids, objective, len(folds), dp_time, valid))
+    if num_acids > mip_max:
+        return
+    start = time.time()
+    mip_objective, _, solver = solve_fold_model(
+        num_acids, hydrophobic_acids, time_limit)
+    mip_time = time.time() - start
+    print("%s n=%d mip objective=%d vars=%d constraints=%d time=%.2fs "
+          "speedup=%.0fx matches: %s" % (
+              name, num_acids, mip_objective, solver.NumVariables(),
+              solver.NumConstraints(), mip_time,
+              mip_time / max(dp_time, 1e-6), mip_objective == objective))
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        description="Protein folding by the MIP and by dynamic programming")
+    parser.add_argument("-n", type=int, nargs="+",
+                        default=[200, 500, 1000, 2000])
+    parser.add_argument("--share", type=float, default=0.5,
+                        help="share of hydrophobic acids")
+    parser.add_argument("--mip-max", type=int, default=200,
+                        help="longest sequence the MIP still runs on")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="seconds per MIP solve")
+    args = parser.parse_args()
+    for name in sorted(SEQUENCES):
+        num_acids, hydrophobic_acids = SEQUENCES[name]
+        bench(name, num_acids, hydrophobic_acids, args.mip_max,
+              args.time_limit)
+    for n in args.n:
+        bench("random", n, random_sequence(n, args.share), args.mip_max,
+              args.time_limit)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,33 @@
+import contextlib
+import io
+import time
+
+from model import lost_baggage, milk_collection
+
+
+def quiet(func):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func()
+
+
+def bench(name, module, is_valid):
+    start = time.time()
+    mip_obj, tours = quiet(module.run_mip)
+    mip_time = time.time() - start
+    start = time.time()
+    obj, _, status = module.solve_circuit()
+    circuit_time = time.time() - start
+    print("%s mip=%.3f (%.2fs, valid=%s) circuit=%.3f (%.2fs, %s)" % (
+        name, mip_obj, mip_time, is_valid(tours), obj, circuit_time, status))
+
+
+def run():
+    # the iterative loop stops after 10 rounds, whatever its tours look like
+    bench("milk_collection", milk_collection,
+          lambda tours: all(len(c) == 1 for c in tours.values()))
+    bench("lost_baggage", lost_baggage,
+          lambda paths: all(len(p) <= 1 for p in paths.values()))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,292 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+from ortools.linear_solver import pywraplp
+from scipy.optimize import linprog
+
+# linprog status codes, the glop engine reports the same ones
+OPTIMAL = 0
+INFEASIBLE = 2
+UNBOUNDED = 3
+ABNORMAL = 4
+GLOP_STATUS = {
+    pywraplp.Solver.OPTIMAL: OPTIMAL,
+    pywraplp.Solver.INFEASIBLE: INFEASIBLE,
+    pywraplp.Solver.UNBOUNDED: UNBOUNDED,
+}
+
+
+def generate_units(num_units, num_inputs=6, num_outputs=3, seed=0):
+    # outputs follow a noisy production function of the inputs, units with
+    # a large draw of the inefficiency factor fall behind the frontier
+    rng = np.random.default_rng(seed)
+    inputs = np.round(rng.uniform(1, 50, (num_units, num_inputs)), 2)
+    weights = rng.uniform(0.2, 1.0, (num_inputs, num_outputs)) / num_inputs
+    frontier = np.sqrt(inputs) @ weights
+    inefficiency = np.exp(-rng.exponential(0.2, (num_units, 1)))
+    noise = rng.uniform(0.9, 1.1, (num_units, num_outputs))
+    outputs = np.round(frontier * inefficiency * noise, 3)
+    return inputs, outputs
+
+
+class DeaResult(object):
+    # efficient[j] is true when no combination of the other units produces
+    # at least unit j's outputs from at most its inputs; otherwise theta[j]
+    # is the largest factor its outputs can be scaled by and row j of the
+    # csr matrix lambdas holds the weights of its peers
+    def __init__(self, status, theta, lambdas, stats=None):
+        self.status = status
+        self.theta = theta
+        self.lambdas = lambdas
+        self.stats = stats or {}
+
+    @property
+    def efficient(self):
+        return self.status == INFEASIBLE
+
+    @property
+    def efficiency(self):
+        return np.where(self.efficient, 1.0, 1 / self.theta)
+
+    def peers(self, j):
+        return self.lambdas.indices[self.lambdas.indptr[j]:
+                                    self.lambdas.indptr[j + 1]]
+
+
+class DeaModel(object):
+    # output oriented envelopment LP of unit j over x = (lambda, theta)
+    #   max theta
+    #   sum_i lambda_i inputs_i <= inputs_j
+    #   theta outputs_j - sum_i lambda_i outputs_i <= 0
+    #   lambda >= 0, lambda_j = 0, theta >= 1
+    # the matrix is built once, per unit only theta's column, the rhs and
+    # the upper bound of lambda_j change
+    def __init__(self, inputs, outputs):
+        self.inputs = np.asarray(inputs, dtype=float)
+        self.outputs = np.asarray(outputs, dtype=float)
+        num_units, num_inputs = self.inputs.shape
+        num_outputs = self.outputs.shape[1]
+        self.num_units = num_units
+        self.num_inputs = num_inputs
+        theta = sparse.csc_matrix(
+            (np.ones(num_outputs),
+             (np.arange(num_inputs, num_inputs + num_outputs),
+              np.zeros(num_outputs, dtype=int))),
+            shape=(num_inputs + num_outputs, 1))
+        self.a_ub = sparse.hstack([
+            sparse.vstack([sparse.csc_matrix(self.inputs.T),
+                           sparse.csc_matrix(-self.outputs.T)]),
+            theta], format="csc")
+        self.theta_data = slice(self.a_ub.indptr[num_units],
+                                self.a_ub.indptr[num_units + 1])
+        self.b_ub = np.zeros(num_inputs + num_outputs)
+        self.c = np.zeros(num_units + 1)
+        self.c[-1] = -1
+        self.bounds = np.zeros((num_units + 1, 2))
+        self.bounds[:, 1] = np.inf
+        self.bounds[-1, 0] = 1
+
+    def solve(self, j):
+        self.a_ub.data[self.theta_data] = self.outputs[j]
+        self.b_ub[:self.num_inputs] = self.inputs[j]
+        # unit j leaves the reference set through its bound, not a copy
+        self.bounds[j, 1] = 0
+        try:
+            # presolve costs more than it saves on these few long rows
+            return linprog(self.c, A_ub=self.a_ub, b_ub=self.b_ub,
+                           bounds=self.bounds, method="highs",
+                           options={"presolve": False})
+        finally:
+            self.bounds[j, 1] = np.inf
+
+    def solve_units(self, units, eps=1e-9):
+        status = np.zeros(len(units), dtype=np.int8)
+        theta = np.full(len(units), np.nan)
+        rows = []
+        cols = []
+        vals = []
+        for k, j in enumerate(units):
+            ret = self.solve(j)
+            status[k] = ret.status
+            if ret.status != OPTIMAL:
+                continue
+            theta[k] = ret.x[-1]
+            peers = np.flatnonzero(ret.x[:-1] > eps)
+            rows.append(np.full(len(peers), k))
+            cols.append(peers)
+            vals.append(ret.x[peers])
+        if not rows:
+            return status, theta, np.zeros(0, dtype=int), \
+                np.zeros(0, dtype=int), np.zeros(0)
+        return status, theta, np.concatenate(rows), np.concatenate(cols), \
+            np.concatenate(vals)
+
+
+# the model each pool worker builds once and reuses for all its chunks
+worker_model = None
+
+
+def init_worker(inputs, outputs):
+    global worker_model
+    worker_model = DeaModel(inputs, outputs)
+
+
+def solve_chunk(units):
+    return worker_model.solve_units(units)
+
+
+def solve_dea(inputs, outputs, workers=None, chunk_size=None):
+    model = DeaModel(inputs, outputs)
+    n = model.num_units
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        parts = [model.solve_units(np.arange(n))]
+        chunks = [np.arange(n)]
+    else:
+        # a few chunks per worker keeps them busy when chunks run unevenly
+        chunk_size = chunk_size or max(1, n // (4 * workers))
+        chunks = np.array_split(np.arange(n), max(1, n // chunk_size))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(model.inputs, model.outputs)) \
+                as executor:
+            parts = list(executor.map(solve_chunk, chunks))
+    status = np.concatenate([p[0] for p in parts])
+    theta = np.concatenate([p[1] for p in parts])
+    rows = np.concatenate([chunk[p[2]] for chunk, p in zip(chunks, parts)])
+    lambdas = sparse.csr_matrix(
+        (np.concatenate([p[4] for p in parts]),
+         (rows, np.concatenate([p[3] for p in parts]))), shape=(n, n))
+    return DeaResult(status, theta, lambdas)
+
+
+def screen_units(inputs, outputs, block=256):
+    # dominated[j]: another unit uses no more of every input and makes no
+    # less of every output, strictly better in one of them; j is inefficient
+    # and any peer weight on it moves to the dominating unit at no loss.
+    # efficient[j]: j has the strictly largest ratio output_r / input_k of
+    # all units for some pair (k, r), so no combination of the others can
+    # match its output r from its input k
+    inputs = np.asarray(inputs, dtype=float)
+    outputs = np.asarray(outputs, dtype=float)
+    n = len(inputs)
+    dominated = np.zeros(n, dtype=bool)
+    for start in range(0, n, block):
+        x = inputs[start:start + block, None, :]
+        y = outputs[start:start + block, None, :]
+        weak = (inputs[None] <= x).all(axis=2) & \
+            (outputs[None] >= y).all(axis=2)
+        strict = (inputs[None] < x).any(axis=2) | \
+            (outputs[None] > y).any(axis=2)
+        dominated[start:start + block] = (weak & strict).any(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = outputs[:, None, :] / inputs[:, :, None]
+    ratio = np.nan_to_num(ratio, nan=0.0).reshape(n, -1)
+    efficient = np.zeros(n, dtype=bool)
+    if n > 1:
+        top = -np.partition(-ratio, 1, axis=0)
+        unique = top[0] > top[1]
+        efficient[ratio.argmax(axis=0)[unique]] = True
+    return efficient, dominated
+
+
+class GlopDeaModel(object):
+    # DeaModel's LP kept in one glop solver over the reference units only;
+    # per unit the theta coefficients, the input bounds and lambda_j's bound
+    # are updated in place and glop restarts from its last basis
+    def __init__(self, inputs, outputs, reference=None):
+        self.inputs = np.asarray(inputs, dtype=float)
+        self.outputs = np.asarray(outputs, dtype=float)
+        n = len(self.inputs)
+        self.reference = np.arange(n) if reference is None else \
+            np.asarray(reference)
+        # column of each unit in the reference set, -1 if left out
+        self.column = np.full(n, -1)
+        self.column[self.reference] = np.arange(len(self.reference))
+
+        self.solver = pywraplp.Solver(
+            "dea", pywraplp.Solver.GLOP_LINEAR_PROGRAMMING)
+        infinity = self.solver.infinity()
+        self.lam = [self.solver.NumVar(0, infinity, "")
+                    for _ in range(len(self.reference))]
+        self.theta = self.solver.NumVar(1, infinity, "theta")
+        self.input_rows = self.add_rows(self.inputs[self.reference])
+        self.output_rows = self.add_rows(-self.outputs[self.reference])
+        objective = self.solver.Objective()
+        objective.SetCoefficient(self.theta, 1)
+        objective.SetMaximization()
+
+    def add_rows(self, data):
+        rows = []
+        for values in data.T.tolist():
+            row = self.solver.Constraint(-self.solver.infinity(), 0, "")
+            for x, value in zip(self.lam, values):
+                if value != 0:
+                    row.SetCoefficient(x, value)
+            rows.append(row)
+        return rows
+
+    def solve(self, j, eps=1e-9):
+        for row, value in zip(self.input_rows, self.inputs[j].tolist()):
+            row.SetUb(value)
+        for row, value in zip(self.output_rows, self.outputs[j].tolist()):
+            row.SetCoefficient(self.theta, value)
+        k = self.column[j]
+        if k >= 0:
+            self.lam[k].SetUb(0)
+        status = GLOP_STATUS.get(self.solver.Solve(), ABNORMAL)
+        theta = np.nan
+        values = np.zeros(len(self.lam))
+        # the solution has to be read before the model changes again
+        if status == OPTIMAL:
+            theta = self.theta.solution_value()
+            values = np.array([x.solution_value() for x in self.lam])
+        if k >= 0:
+            self.lam[k].SetUb(self.solver.infinity())
+        peers = np.flatnonzero(values > eps)
+        return status, theta, self.reference[peers], values[peers]
+
+
+def solve_dea_glop(inputs, outputs, screen=True, scores=True):
+    # with scores off the dominated units are only classified, their theta
+    # and peers are left empty
+    inputs = np.asarray(inputs, dtype=float)
+    outputs = np.asarray(outputs, dtype=float)
+    n = len(inputs)
+    if screen:
+        efficient, dominated = screen_units(inputs, outputs)
+    else:
+        efficient = dominated = np.zeros(n, dtype=bool)
+    model = GlopDeaModel(inputs, outputs, np.flatnonzero(~dominated))
+
+    status = np.where(efficient, INFEASIBLE, OPTIMAL).astype(np.int8)
+    theta = np.full(n, np.nan)
+    rows = []
+    cols = []
+    vals = []
+    skip = efficient | (dominated & (not scores))
+    for j in np.flatnonzero(~skip).tolist():
+        status[j], theta[j], peers, weights = model.solve(j)
+        rows.append(np.full(len(peers), j))
+        cols.append(peers)
+        vals.append(weights)
+    lambdas = sparse.csr_matrix(
+        (concat(vals, float), (concat(rows, int), concat(cols, int))),
+        shape=(n, n))
+    stats = {
+        "units": n,
+        "reference": len(model.reference),
+        "screened_efficient": int(efficient.sum()),
+        "screened_dominated": int(dominated.sum()),
+        "lps": int(n - skip.sum()),
+        "skipped": int(skip.sum()),
+    }
+    return DeaResult(status, theta, lambdas, stats)
+
+
+def concat(parts, dtype):
+    if not parts:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate(parts).astype(dtype)
@@ -2,6 +2,16 @@ import numpy as np
 
 from ortools.linear_solver import pywraplp
 
+from lp.builder import ModelBuilder, concatenate, matmul
+
+NUM_YEARS = 5
+PRODUCT_MAT = [[0.1, 0.5, 0.4], [0.1, 0.1, 0.2], [0.2, 0.1, 0.2], [0.6, 0.3, 0.2]]
+CAPACITY_MAT = [[0.0, 0.7, 0.9], [0.1, 0.1, 0.2], [0.2, 0.1, 0.2], [0.4, 0.2, 0.1]]
+STOCK0 = [150, 80, 100]
+CAPACITY0 = [300, 350, 280]
+MANPOWER_LIMIT = 470
+CONSUMPTION = [60, 60, 30]
+
 
 def print_solver(solver):
     print('Number of variables = %d' % solver.NumVariables())
@@ -10,169 +20,107 @@ def print_solver(solver):
 
 
 def solver_linear_system(a, b):
-    solver = pywraplp.Solver('linear_system',
-                             pywraplp.Solver.CLP_LINEAR_PROGRAMMING)
-    num_cols = len(a[0])
-    num_rows = len(b)
-    variables = [solver.NumVar(0, solver.Infinity(), "x_%d" % j) for j in range(num_cols)]
-    for k in range(num_rows):
-        lhs = sum(a[k][j] * variables[j] for j in range(num_cols))
-        solver.Add(lhs == b[k])
-    solver.Minimize(0)
-    solver.Solve()
-    return [x.solution_value() for x in variables]
-
-
-def run():
-    # Solver
-    solver = pywraplp.Solver('economic_planning',
-                             pywraplp.Solver.CLP_LINEAR_PROGRAMMING)
-    infinity = solver.Infinity()
-
-    # Context
-    num_industries = 3
-    num_years = 5
-    product_mat = [[0.1, 0.5, 0.4], [0.1, 0.1, 0.2], [0.2, 0.1, 0.2], [0.6, 0.3, 0.2]]
-    capacity_mat = [[0.0, 0.7, 0.9], [0.1, 0.1, 0.2], [0.2, 0.1, 0.2], [0.4, 0.2, 0.1]]
-    stock0 = [150, 80, 100]
-    capacity0 = [300, 350, 280]
-    manpower_limit = 470
-    consumption = [60, 60, 30]
-
-    def calc_final_product(b):
-        num = len(b)
-        a = np.zeros((num, num))
-        for i in range(num):
-            for j in range(num):
-                if i == j:
-                    a[i][j] = 1 - product_mat[i][j]
-                else:
-                    a[i][j] = - product_mat[i][j]
-        return solver_linear_system(a, b)
-
-    final_product = calc_final_product(consumption)
-    print("final stock:", final_product)
+    builder = ModelBuilder('linear_system')
+    variables = builder.var(len(a[0]), name="x")
+    builder.add(matmul(a, variables) == b)
+    builder.minimize(0)
+    builder.solve(pywraplp.Solver.CLP_LINEAR_PROGRAMMING)
+    return variables.value().tolist()
+
+
+def calc_final_product(product_mat, b):
+    num = len(b)
+    a = np.eye(num) - np.asarray(product_mat)[:num]
+    return solver_linear_system(a, b)
+
+
+def build_model(builder, objective="manpower", num_years=NUM_YEARS,
+                product_mat=PRODUCT_MAT, capacity_mat=CAPACITY_MAT,
+                stock0=STOCK0, capacity0=CAPACITY0,
+                manpower_limit=MANPOWER_LIMIT, consumption=CONSUMPTION,
+                final_product=None):
+    # the last row of product_mat and capacity_mat is manpower
+    num_industries = len(stock0)
+    if final_product is None:
+        final_product = calc_final_product(product_mat, consumption)
 
     # Variable
-    xt = {}
-    st = {}
-    yt = {}
-    for i in range(num_industries):
-        for t in range(num_years):
-            xt[(i, t + 1)] = solver.NumVar(0, infinity, "x_%d_%d" % (i, t))
-            st[(i, t + 1)] = solver.NumVar(0, infinity, "s_%d_%d" % (i, t))
-            yt[(i, t + 2)] = solver.NumVar(0, infinity, "y_%d_%d" % (i, t))
-        st[(i, 0)] = stock0[i]
+    # output x and stock s of year t + 1, extra capacity y of year t + 2
+    xt = builder.var((num_industries, num_years), name="x")
+    st = builder.var((num_industries, num_years), name="s")
+    yt = builder.var((num_industries, num_years), name="y")
+    # input of industry k (k = num_industries is manpower) in year t + 1
+    inputs = matmul(product_mat, xt) + matmul(capacity_mat, yt)
 
     # Constraint
-    def calc_industry_input(k, t):
-        lhs = 0
-        for j in range(num_industries):
-            lhs += xt[(j, t + 1)] * product_mat[k][j] + yt[(j, t + 2)] * capacity_mat[k][j]
-        return lhs
-
-    # Manpower
     def add_manpower_limit():
-        for t in range(num_years):
-            lhs = calc_industry_input(3, t)
-            solver.Add(lhs <= manpower_limit, "manpower_%d" % t)
+        builder.add(inputs[num_industries] <= manpower_limit, "manpower")
 
-    # Stock
     def add_consumption(b):
-        for t in range(num_years):
-            for i in range(num_industries):
-                input = calc_industry_input(i, t)
-                expr = st[(i, t + 1)] == st[(i, t)] - input - b[i] + xt[(i, t + 1)]
-                solver.Add(expr, "consumption_%d_%d" % (i, t))
+        stock = concatenate([np.reshape(stock0, (-1, 1)), st[:, :-1]], axis=1)
+        b = np.reshape(b, (-1, 1))
+        builder.add(st == stock - inputs[:num_industries] - b + xt,
+                    "consumption")
 
     # Capacity
-    for t in range(num_years):
-        for i in range(num_industries):
-            caps = sum(yt[(i, l)] for l in range(2, t + 1))
-            expr = xt[(i, t + 1)] <= capacity0[i] + caps
-            solver.Add(expr, "capacity_%d_%d" % (i, t))
+    # y of years 2 .. t counts towards the capacity of year t
+    years = np.arange(num_years)
+    built = (years[None, :] <= years[:, None] - 2).astype(float)
+    caps = (yt[:, None, :] * built).sum(axis=2)
+    builder.add(xt <= np.reshape(capacity0, (-1, 1)) + caps, "capacity")
     # Final
-    for i in range(num_industries):
-        solver.Add(xt[(i, 5)] >= final_product[i])
-        solver.Add(yt[(i, 6)] == 0)
+    builder.add(xt[:, -1] >= final_product, "final")
+    builder.add(yt[:, -1] == 0, "final_capacity")
 
     # Object
-    def max_capacity():
+    if objective == "capacity":
         add_manpower_limit()
         add_consumption(consumption)
-        caps = sum(yt[(i, l)] for i in range(num_industries) for l in range(2, num_years + 1))
-        solver.Maximize(caps)
-
-    def max_product():
+        builder.maximize(yt[:, :-1].sum())
+    elif objective == "product":
         add_manpower_limit()
-        b = [0, 0, 0]
-        add_consumption(b)
-        prod = sum(xt[(i, t)] for i in range(num_industries) for t in range(4, 6))
-        solver.Maximize(prod)
-
-    def max_manpower():
+        add_consumption(np.zeros(num_industries))
+        builder.maximize(xt[:, -2:].sum())
+    elif objective == "manpower":
         add_consumption(consumption)
-        power = sum(calc_industry_input(3, t) for t in range(num_years))
-        solver.Maximize(power)
-
-    def print_capacity():
-        for i in range(num_industries):
-            out = "capacity %d:" % i
-            for t in range(1, num_years + 1):
-                caps = sum(yt[(i, l)].solution_value() for l in range(2, t + 1)) + capacity0[i]
-                out += "\t%.2f" % caps
-            print(out)
-
-    def print_extra_capacity():
-        for i in range(num_industries):
-            out = "extra %d:" % i
-            for t in range(num_years):
-                out += "\t%.2f" % yt[(i, t + 2)].solution_value()
-            print(out)
+        builder.maximize(inputs[num_industries].sum())
+    else:
+        raise ValueError("unknown objective %s" % objective)
+    return xt, st, yt, inputs
 
-    def print_output():
-        for i in range(num_industries):
-            out = "output %d:" % i
-            for t in range(1, num_years + 1):
-                out += "\t%.2f" % xt[(i, t)].solution_value()
-            print(out)
 
-    def print_stock():
-        for i in range(num_industries):
-            out = "stock %d:" % i
-            for t in range(1, num_years + 1):
-                out += "\t%.2f" % st[(i, t)].solution_value()
+def run():
+    builder = ModelBuilder('economic_planning')
+    final_product = calc_final_product(PRODUCT_MAT, CONSUMPTION)
+    print("final stock:", final_product)
+    # objective is one of "capacity", "product" and "manpower"
+    xt, st, yt, inputs = build_model(builder, "manpower",
+                                     final_product=final_product)
+    builder.solve(pywraplp.Solver.CLP_LINEAR_PROGRAMMING)
+    print_solver(builder.solver)
+
+    num_industries, num_years = xt.shape
+    x_val = xt.value()
+    s_val = st.value()
+    y_val = yt.value()
+    input_val = builder.value(inputs)
+    # capacity at the end of each year, extensions of year t included
+    cap_val = np.cumsum(y_val, axis=1) - y_val + np.reshape(CAPACITY0, (-1, 1))
+
+    def print_rows(prefix, values, rows):
+        for i in rows:
+            out = "%s %d:" % (prefix, i)
+            for t in range(num_years):
+                out += "\t%.2f" % values[i][t]
             print(out)
 
-    def print_input(k, prefix="input"):
-        out = "%s %d:" % (prefix, k)
-        for t in range(1, num_years + 1):
-            lhs = 0
-            for j in range(num_industries):
-                lhs += xt[(j, t)].solution_value() * product_mat[k][j] + \
-                       yt[(j, t + 1)].solution_value() * capacity_mat[k][j]
-            out += "\t%.2f" % lhs
-        print(out)
-
-    def print_manpower():
-        print_input(3, "manpower")
-
-    def print_variable():
-        print_extra_capacity()
-        print_capacity()
-        print_output()
-        print_stock()
-        print_manpower()
-        for i in range(num_industries):
-            print_input(i)
-
-    # max_capacity()
-    # max_product()
-    max_manpower()
-
-    solver.Solve()
-    print_solver(solver)
-    print_variable()
+    industries = range(num_industries)
+    print_rows("extra", y_val, industries)
+    print_rows("capacity", cap_val, industries)
+    print_rows("output", x_val, industries)
+    print_rows("stock", s_val, industries)
+    print_rows("manpower", input_val, [num_industries])
+    print_rows("input", input_val, industries)
 
 
 if __name__ == '__main__':
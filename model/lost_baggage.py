@@ -1,4 +1,34 @@
+import time
+
+import numpy as np
 from ortools.linear_solver import pywraplp
+from ortools.sat.python import cp_model
+
+from model import routing
+from util.distance import DistanceMatrix
+
+TIME_LIMIT = 120
+NUM_VANS = 2
+AIRPORT_NAME = ["Heathrow", "Harrow", "Ealing", "Holborn", "Sutton",
+                "Dartford", "Bromley", "Greenwich", "Barking", "Hammersmith",
+                "Kingston", "Richmond", "Battersea", "Islington", "Woolwich"]
+ETA_MAP = [
+    [20],
+    [25, 15],
+    [35, 35, 30],
+    [65, 60, 50, 45],
+    [90, 55, 70, 60, 46],
+    [85, 57, 55, 53, 15, 15],
+    [80, 85, 50, 55, 45, 15, 17],
+    [86, 90, 65, 47, 75, 25, 25, 25],
+    [25, 25, 10, 12, 25, 45, 41, 40, 65],
+    [35, 35, 25, 22, 11, 65, 25, 34, 70, 20],
+    [20, 30, 15, 20, 19, 53, 33, 32, 72, 8, 5],
+    [44, 37, 24, 12, 15, 43, 27, 20, 61, 7, 12, 14],
+    [35, 20, 20, 10, 25, 63, 45, 30, 45, 15, 45, 34, 30],
+    [82, 40, 90, 21, 25, 70, 30, 10, 13, 25, 65, 56, 40, 27]
+]
+AIRPORT_ETA = DistanceMatrix.from_lower(ETA_MAP)
 
 
 def print_solver(solver):
@@ -7,37 +37,113 @@ def print_solver(solver):
     print("Objective value = %f" % solver.Objective().Value())
 
 
+def generate_eta(num_airports, radius=40, seed=0):
+    # whole minutes between random points, Heathrow is airport 0
+    rng = np.random.default_rng(seed)
+    east = rng.uniform(-radius, radius, num_airports)
+    north = rng.uniform(-radius, radius, num_airports)
+    east[0] = north[0] = 0
+    eta = DistanceMatrix.from_points(east, north)
+    eta.data = np.round(eta.data)
+    return eta
+
+
+def shortest_paths(eta):
+    # Floyd-Warshall on the full matrix, one vectorized relaxation per node
+    sp = eta.to_full().copy()
+    for k in range(eta.n):
+        np.minimum(sp, sp[:, k:k + 1] + sp[k], out=sp)
+    return sp
+
+
+def solve_circuit(eta=AIRPORT_ETA, num_vans=NUM_VANS, eta_limit=TIME_LIMIT,
+                  time_limit=None):
+    # each van drives an open path from Heathrow, modelled as a circuit
+    # whose arcs back to Heathrow cost nothing
+    model = cp_model.CpModel()
+    num_airports = eta.n
+    zk = [model.NewBoolVar("z_%d" % k) for k in range(num_vans)]
+    yk = {}
+    for k in range(num_vans):
+        for i in range(1, num_airports):
+            yk[(k, i)] = model.NewBoolVar("y_%d_%d" % (k, i))
+            model.AddImplication(yk[(k, i)], zk[k])
+    for i in range(1, num_airports):
+        model.AddExactlyOne(yk[(k, i)] for k in range(num_vans))
+
+    # the eta table is integral already
+    max_eta = model.NewIntVar(0, eta_limit, "max_eta")
+    van_arcs = []
+    for k in range(num_vans):
+        visit = [zk[k]] + [yk[(k, i)] for i in range(1, num_airports)]
+        arcs = routing.add_tour(model, num_airports, visit, "x_%d" % k)
+        van_arcs.append(arcs)
+        van_eta = routing.tour_cost(arcs, eta, open_end=True, scale=1)
+        model.Add(van_eta <= max_eta)
+    # van order
+    for k in range(num_vans - 1):
+        model.Add(sum(yk[(k, i)] for i in range(1, num_airports)) >=
+                  sum(yk[(k + 1, i)] for i in range(1, num_airports)))
+    model.Minimize(max_eta)
+
+    solver, status = routing.solve(model, time_limit)
+    paths = [routing.extract_tour(solver, arcs) for arcs in van_arcs]
+    return solver.ObjectiveValue(), paths, status
+
+
+def solve_minmax(eta=AIRPORT_ETA, num_vans=NUM_VANS, eta_limit=TIME_LIMIT,
+                 time_limit=None):
+    # all vans share one multiple circuit through Heathrow and the arrival
+    # time at each airport replaces the per-van arc copies, so there is no
+    # van symmetry left to break; eta must be in whole minutes
+    model = cp_model.CpModel()
+    num_airports = eta.n
+    arcs = routing.add_routes(model, num_airports)
+    model.Add(sum(arcs[(0, j)] for j in range(1, num_airports)) <= num_vans)
+
+    # no van reaches an airport before the shortest path from Heathrow does
+    earliest = shortest_paths(eta)[0]
+    arrive = [0] + [model.NewIntVar(int(earliest[i]), eta_limit, "t_%d" % i)
+                    for i in range(1, num_airports)]
+    for (i, j), lit in arcs.items():
+        if j != 0:
+            model.Add(arrive[j] >= arrive[i] + int(eta(i, j))).OnlyEnforceIf(lit)
+    max_eta = model.NewIntVar(0, eta_limit, "max_eta")
+    for i in range(1, num_airports):
+        model.Add(max_eta >= arrive[i])
+    # the routes together drive every arc they use, which bounds the longest
+    total = routing.tour_cost(arcs, eta, open_end=True, scale=1)
+    model.Add(num_vans * max_eta >= total)
+    model.Minimize(max_eta)
+
+    solver, status = routing.solve(model, time_limit)
+    paths = routing.extract_routes(solver, arcs)
+    return solver.ObjectiveValue(), paths, status
+
+
 def run():
+    eta, paths, status = solve_minmax()
+    print("Status %s" % status)
+    print("Max ETA = %d" % eta)
+    for k, path in enumerate(paths):
+        print("Van %d" % k)
+        print("ETA = %d" % routing.tour_length(path, AIRPORT_ETA, open_end=True))
+        print(path)
+        print(*[AIRPORT_NAME[x] for x in path], sep="\t")
+
+
+def run_mip(eta=AIRPORT_ETA, num_vans=NUM_VANS, eta_limit=TIME_LIMIT,
+            time_limit=None):
+    # time_limit caps the seconds over all subtour rounds
     # Solver
     solver = pywraplp.Solver('lost_baggage',
                              pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
 
     # Context
-    time_limit = 120
-    airport_name = ["Heathrow", "Harrow", "Ealing", "Holborn", "Sutton",
-                    "Dartford", "Bromley", "Greenwich", "Barking", "Hammersmith",
-                    "Kingston", "Richmond", "Battersea", "Islington", "Woolwich"]
-    num_airports = len(airport_name)
-    num_vans = 2
-    eta_map = [
-        [20],
-        [25, 15],
-        [35, 35, 30],
-        [65, 60, 50, 45],
-        [90, 55, 70, 60, 46],
-        [85, 57, 55, 53, 15, 15],
-        [80, 85, 50, 55, 45, 15, 17],
-        [86, 90, 65, 47, 75, 25, 25, 25],
-        [25, 25, 10, 12, 25, 45, 41, 40, 65],
-        [35, 35, 25, 22, 11, 65, 25, 34, 70, 20],
-        [20, 30, 15, 20, 19, 53, 33, 32, 72, 8, 5],
-        [44, 37, 24, 12, 15, 43, 27, 20, 61, 7, 12, 14],
-        [35, 20, 20, 10, 25, 63, 45, 30, 45, 15, 45, 34, 30],
-        [82, 40, 90, 21, 25, 70, 30, 10, 13, 25, 65, 56, 40, 27]
-    ]
-
-    def get_eta(i, j):
-        return eta_map[j - 1][i] if i < j else eta_map[i - 1][j]
+    num_airports = eta.n
+    airport_name = AIRPORT_NAME if num_airports == len(AIRPORT_NAME) else \
+        ["%d" % i for i in range(num_airports)]
+    get_eta = eta
 
     # Variable
     xk = {}
@@ -99,11 +205,11 @@ def run():
         return total_eta
 
     van_eta = {}
-    max_eta = solver.NumVar(0, time_limit, "max_eta")
+    max_eta = solver.NumVar(0, eta_limit, "max_eta")
     for k in range(num_vans):
-        eta = get_total_eta(k)
-        solver.Add(eta <= max_eta, "time_%d" % k)
-        van_eta[k] = eta
+        total_eta = get_total_eta(k)
+        solver.Add(total_eta <= max_eta, "time_%d" % k)
+        van_eta[k] = total_eta
 
     # van order
     def get_visit(vk):
@@ -235,22 +341,33 @@ def run():
     solver.Minimize(obj)
     max_iter = 10
     van_path = {}
+    best_eta = np.nan
+    deadline = None if time_limit is None else time.time() + time_limit
     for itr in range(max_iter):
-        solver.Solve()
+        if deadline is not None:
+            remaining = deadline - time.time()
+            if remaining <= 0 and itr > 0:
+                break
+            solver.SetTimeLimit(max(1, int(remaining * 1000)))
+        result = solver.Solve()
+        if result not in (solver.OPTIMAL, solver.FEASIBLE):
+            break
         print("Iteration: %d" % itr)
         print_solver(solver)
+        # read before the subtour cuts change the model
+        best_eta = max_eta.solution_value()
         van_path = find_all_path(num_vans)
         has_sub = add_constraint_subtour(van_path)
         if not has_sub:
             break
         print_all_subtour(van_path)
 
-    print("\nMax ETA = %d" % max_eta.solution_value())
+    print("\nMax ETA = %d" % best_eta)
     # print_yk()
     # print_all_xk()
     # print_van_eta()
     print_path_eta(van_path)
-
+    return best_eta, van_path
 
 if __name__ == '__main__':
     run()
@@ -1,6 +1,18 @@
-import math
-
+import numpy as np
 from ortools.linear_solver import pywraplp
+from ortools.sat.python import cp_model
+
+from lp.builder import ModelBuilder
+from model import routing
+from util.distance import DistanceMatrix
+
+NUM_DAY = 2
+NUM_EVERYDAY = 10
+FARM_EAST = [0, -3, 1, 4, -5, -5, -4, 6, 3, -1, 0, 6, 2, -2, 6, 1, -3, -6, 2, -6, 5]
+FARM_NORTH = [0, 3, 11, 7, 9, -2, -7, 0, -6, -3, -6, 4, 5, 8, 10, 8, 1, 5, 9, -5, -4]
+FARM_COLLECTION = [0, 5, 4, 3, 6, 7, 3, 4, 6, 5, 4, 7, 3, 4, 5, 6, 8, 5, 7, 6, 6]
+CAPACITY = 80
+FARM_DIST = DistanceMatrix.from_points(FARM_EAST, FARM_NORTH)
 
 
 def print_solver(solver):
@@ -9,215 +21,176 @@ def print_solver(solver):
     print("Objective value = %f" % solver.Objective().Value())
 
 
+def solve_circuit(time_limit=None):
+    # one circuit per day, the every-other-day farms are optional nodes
+    model = cp_model.CpModel()
+    num_farms = len(FARM_COLLECTION)
+    yk = {}
+    for k in range(NUM_DAY):
+        for i in range(NUM_EVERYDAY, num_farms):
+            yk[(k, i)] = model.NewBoolVar("y_%d_%d" % (k, i))
+    for i in range(NUM_EVERYDAY, num_farms):
+        model.AddExactlyOne(yk[(k, i)] for k in range(NUM_DAY))
+    model.Add(yk[(0, NUM_EVERYDAY)] == 1)
+
+    day_arcs = []
+    cost = 0
+    capacity_extra = CAPACITY - sum(FARM_COLLECTION[:NUM_EVERYDAY])
+    for k in range(NUM_DAY):
+        visit = [yk.get((k, i)) for i in range(num_farms)]
+        arcs = routing.add_tour(model, num_farms, visit, "x_%d" % k)
+        day_arcs.append(arcs)
+        cost += routing.tour_cost(arcs, FARM_DIST)
+        model.Add(sum(yk[(k, i)] * FARM_COLLECTION[i]
+                      for i in range(NUM_EVERYDAY, num_farms)) <= capacity_extra)
+    model.Minimize(cost)
+
+    solver, status = routing.solve(model, time_limit)
+    tours = [routing.extract_tour(solver, arcs) for arcs in day_arcs]
+    dist = sum(routing.tour_length(tour, FARM_DIST) for tour in tours)
+    return dist, tours, status
+
+
 def run():
-    # Solver
-    solver = pywraplp.Solver('milk_collection',
-                             pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
-
-    # Context
-    num_day = 2
-    num_farms = 21
-    num_everyday = 10
-    idx_other = num_everyday
-    farm_east = [0, -3, 1, 4, -5, -5, -4, 6, 3, -1, 0, 6, 2, -2, 6, 1, -3, -6, 2, -6, 5]
-    farm_north = [0, 3, 11, 7, 9, -2, -7, 0, -6, -3, -6, 4, 5, 8, 10, 8, 1, 5, 9, -5, -4]
-    farm_collection = [0, 5, 4, 3, 6, 7, 3, 4, 6, 5, 4, 7, 3, 4, 5, 6, 8, 5, 7, 6, 6]
-    capacity = 80
-
-    dist_map = {}
-
-    def get_farm_dist(i, j):
-        if (i, j) in dist_map:
-            return dist_map[(i, j)]
-        elif (j, i) in dist_map:
-            return dist_map[(j, i)]
-        src_east = farm_east[i]
-        src_north = farm_north[i]
-        dst_east = farm_east[j]
-        dst_north = farm_north[j]
-        diff_east = dst_east - src_east
-        diff_north = dst_north - src_north
-        dist = math.sqrt(diff_east * diff_east + diff_north * diff_north)
-        dist_map[(i, j)] = dist
-        return dist
+    dist, tours, status = solve_circuit()
+    print("Status %s" % status)
+    print("Optimal Dist %f" % dist)
+    for k, tour in enumerate(tours):
+        print("Day %d" % k)
+        print([x + 1 for x in tour])
+        print("Collection %d" % sum(FARM_COLLECTION[f] for f in tour))
+
+
+def build_mip(builder, dist=FARM_DIST, collection=FARM_COLLECTION,
+              num_everyday=NUM_EVERYDAY, capacity=CAPACITY, num_day=NUM_DAY):
+    # xk[k, pair[i, j]] says the tanker drives between farms i and j on day k
+    num_farms = len(collection)
+    collection = np.asarray(collection)
+    pair = np.full((num_farms, num_farms), -1)
+    iu, ju = np.triu_indices(num_farms, 1)
+    pair[iu, ju] = np.arange(len(iu))
+    pair[ju, iu] = pair[iu, ju]
 
     # Variable
-    xk = {}
-    for k in range(num_day):
-        for i in range(num_farms):
-            for j in range(i + 1, num_farms):
-                xk[(k, i, j)] = solver.BoolVar("x_%d_%d_%d" % (k, i, j))
-    yk = {}
-    for k in range(num_day):
-        for i in range(idx_other, num_farms):
-            yk[(k, i)] = solver.BoolVar("y_%d_%d" % (k, i))
+    xk = builder.bool_var((num_day, len(iu)), name="x")
+    yk = builder.bool_var((num_day, num_farms - num_everyday), name="y")
 
     # Constraint
     # collection
-    capacity_extra = capacity - sum(farm_collection[i] for i in range(num_everyday))
-    for k in range(num_day):
-        lhs = sum(yk[(k, i)] * farm_collection[i] for i in range(idx_other, num_farms))
-        solver.Add(lhs <= capacity_extra)
+    capacity_extra = capacity - collection[:num_everyday].sum()
+    builder.add(yk.dot(collection[num_everyday:]) <= capacity_extra,
+                "collection")
     # visit farms only once
-    for i in range(idx_other, num_farms):
-        expr = yk[(0, i)] + yk[(1, i)] == 1
-        solver.Add(expr, "yk_%d" % i)
-
-    # visit farm every day
-    for k in range(num_day):
-        for i in range(num_everyday):
-            lhs = 0
-            for j in range(num_farms):
-                if j < i:
-                    lhs += xk[(k, j, i)]
-                elif i < j:
-                    lhs += xk[(k, i, j)]
-            solver.Add(lhs == 2, "everyday_%d_%d" % (k, i))
-
-    # visit farm every other day
-    for k in range(num_day):
-        for i in range(idx_other, num_farms):
-            lhs = - 2 * yk[(k, i)]
-            for j in range(num_farms):
-                if j < i:
-                    lhs += xk[(k, j, i)]
-                elif i < j:
-                    lhs += xk[(k, i, j)]
-            solver.Add(lhs == 0, "other_%d_%d" % (k, i))
+    builder.add(yk.sum(axis=0) == 1, "yk")
+
+    # every day farms have two arcs, every other day farms two on their day
+    others = ~np.eye(num_farms, dtype=bool)
+    degree = xk[:, pair[others].reshape(num_farms, -1)].sum(axis=2)
+    builder.add(degree[:, :num_everyday] == 2, "everyday")
+    builder.add(degree[:, num_everyday:] - 2 * yk == 0, "other")
 
     # yk upper
-    def add_constraint_upper():
-        for k in range(num_day):
-            for i in range(idx_other, num_farms):
-                for j in range(num_everyday):
-                    solver.Add(xk[(k, j, i)] <= yk[(k, i)], "other1_%d_%d_%d" % (k, j, i))
-                for j in range(i + 1, num_farms):
-                    solver.Add(xk[(k, i, j)] <= yk[(k, i)], "other2_%d_%d_%d" % (k, i, j))
-                    solver.Add(xk[(k, i, j)] <= yk[(k, j)], "other3_%d_%d_%d" % (k, i, j))
+    i, j = np.meshgrid(np.arange(num_everyday, num_farms),
+                       np.arange(num_everyday), indexing="ij")
+    builder.add(xk[:, pair[j, i]] <= yk[:, :, None], "other1")
+    io, jo = np.triu_indices(num_farms - num_everyday, 1)
+    arcs = xk[:, pair[io + num_everyday, jo + num_everyday]]
+    builder.add(arcs <= yk[:, io], "other2")
+    builder.add(arcs <= yk[:, jo], "other3")
 
     # anchor
-    solver.Add(yk[(0, idx_other)] == 1, "anchor")
+    builder.add(yk[0, 0] == 1, "anchor")
 
     # Object
-    obj = 0
-    for i in range(num_farms):
-        for j in range(i + 1, num_farms):
-            obj += (xk[(0, i, j)] + xk[(1, i, j)]) * get_farm_dist(i, j)
-    solver.Minimize(obj)
+    builder.minimize(xk.sum(axis=0).dot(dist.lookup(iu, ju)))
+    return xk, yk, pair
 
-    def print_all_xk():
-        for k in range(num_day):
-            print("Day %d" % k)
-            print_xk(k)
-
-    def print_xk(k):
-        for i in range(num_farms):
-            out = "farm %02d:" % i
-            for j in range(num_farms):
-                c = "-"
-                if i < j:
-                    c = "%d" % xk[(k, i, j)].solution_value()
-                elif i == j:
-                    c = "+"
-                out += "\t%s" % c
-            print(out)
-
-    def print_yk():
-        for k in range(num_day):
-            out = "Day %d:" % k
-            for i in range(idx_other, num_farms):
-                out += "\t%d" % yk[(k, i)].solution_value()
-            print(out)
-
-    def get_next(k, src, last):
-        for f in range(num_farms):
-            if f == src or f == last:
-                continue
-            v = xk[(k, src, f)] if src < f else xk[(k, f, src)]
-            if v.solution_value() == 1:
+
+def add_subtour(builder, xk, pair, k, subtour):
+    sub = np.array(subtour)
+    s, d = np.triu_indices(len(sub), 1)
+    builder.add(xk[k, pair[sub[s], sub[d]]].sum() <= len(sub) - 1, "subtour")
+
+
+def find_cycles(adj):
+    # adj is the 0-1 arc matrix of one day
+    num_farms = len(adj)
+
+    def get_next(src, last):
+        for f in np.flatnonzero(adj[src]).tolist():
+            if f != last:
                 return f
         return -1
 
-    def find_cycle(k):
-        cycles = []
-        visits = set()
-        for src in range(num_farms):
-            if src in visits:
-                continue
-            cycle = [src]
-            last = -1
-            cur = get_next(k, src, last)
-            last = src
-            if cur == -1:
-                continue
-            for itr in range(num_farms):
-                if cur == src:
-                    break
-                visits.add(cur)
-                cycle.append(cur)
-                nxt = get_next(k, cur, last)
-                last = cur
-                cur = nxt
-            cycles.append(cycle)
-        return cycles
+    cycles = []
+    visits = set()
+    for src in range(num_farms):
+        if src in visits:
+            continue
+        cycle = [src]
+        cur = get_next(src, -1)
+        last = src
+        if cur == -1:
+            continue
+        for itr in range(num_farms):
+            if cur == src:
+                break
+            visits.add(cur)
+            cycle.append(cur)
+            nxt = get_next(cur, last)
+            last = cur
+            cur = nxt
+        cycles.append(cycle)
+    return cycles
+
+
+def run_mip():
+    builder = ModelBuilder('milk_collection')
+    xk, yk, pair = build_mip(builder)
+    num_day = xk.shape[0]
+    others = pair >= 0
 
     def find_all_subtour():
-        return dict((x, find_cycle(x)) for x in range(num_day))
-
-    def add_day_subtour(k, subtour):
-        num = len(subtour)
-        lhs = 0
-        for s in range(num - 1):
-            for d in range(s + 1, num):
-                src = subtour[s]
-                dst = subtour[d]
-                lhs += xk[(k, src, dst)] if src < dst else xk[(k, dst, src)]
-        solver.Add(lhs <= num - 1)
-
-    def add_constraint_subtour(k_subtour):
-        has_subtour = False
-        for k, subtours in k_subtour.items():
-            if len(subtours) != 1:
-                has_subtour = True
-                for sub in subtours:
-                    add_day_subtour(k, sub)
-        return has_subtour
-
-    def print_subtour(subtours):
-        for cycle in subtours:
-            print(cycle)
+        k_subtour = {}
+        x_val = xk.value() > 0.5
+        for k in range(num_day):
+            adj = np.zeros(pair.shape, dtype=bool)
+            adj[others] = x_val[k][pair[others]]
+            k_subtour[k] = find_cycles(adj)
+        return k_subtour
 
     def print_all_subtour(subtours):
         for k in range(num_day):
             print("Day %d" % k)
-            print_subtour(subtours[k])
-
-    def print_capacity(k_sub):
-        for k, subs in k_subtour.items():
-            print("Day %d" % k)
-            for sub in subs:
-                print([x + 1 for x in sub])
-                cap = 0
-                for f in sub:
-                    cap += farm_collection[f]
-                print("Collection %d" % cap)
+            for cycle in subtours[k]:
+                print(cycle)
 
     # Solve
-    add_constraint_upper()
     max_iter = 10
     k_subtour = {}
     for itr in range(max_iter):
-        solver.Solve()
+        builder.solve(pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
         print("Iteration: %d" % itr)
-        print_solver(solver)
+        print_solver(builder.solver)
         k_subtour = find_all_subtour()
-        has_sub = add_constraint_subtour(k_subtour)
+        has_sub = False
+        for k, subtours in k_subtour.items():
+            if len(subtours) != 1:
+                has_sub = True
+                for sub in subtours:
+                    add_subtour(builder, xk, pair, k, sub)
         if not has_sub:
             break
         print_all_subtour(k_subtour)
 
-    print("\nOptimal Dist %f" % solver.Objective().Value())
-    print_capacity(k_subtour)
+    objective = builder.solver.Objective().Value()
+    print("\nOptimal Dist %f" % objective)
+    for k, subs in k_subtour.items():
+        print("Day %d" % k)
+        for sub in subs:
+            print([x + 1 for x in sub])
+            print("Collection %d" % sum(FARM_COLLECTION[f] for f in sub))
+    return objective, k_subtour
 
 
 if __name__ == '__main__':
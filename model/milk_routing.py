@@ -0,0 +1,139 @@
+import math
+
+import numpy as np
+from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+
+from model import milk_collection
+from util.distance import DistanceMatrix
+
+# routing costs are integral
+DIST_SCALE = 1000
+
+
+class MilkInstance(object):
+    # farm 0 is the depot, farms 1 .. num_everyday - 1 are collected every
+    # day and the rest every other day; num_vehicles tankers run each day
+    def __init__(self, east, north, collection, num_everyday, capacity,
+                 num_vehicles=1, num_day=2):
+        self.east = np.asarray(east, dtype=float)
+        self.north = np.asarray(north, dtype=float)
+        self.collection = np.asarray(collection, dtype=int)
+        self.num_everyday = num_everyday
+        self.capacity = capacity
+        self.num_vehicles = num_vehicles
+        self.num_day = num_day
+
+    @property
+    def num_farms(self):
+        return len(self.collection)
+
+    @classmethod
+    def default(cls):
+        return cls(milk_collection.FARM_EAST, milk_collection.FARM_NORTH,
+                   milk_collection.FARM_COLLECTION,
+                   milk_collection.NUM_EVERYDAY, milk_collection.CAPACITY,
+                   num_day=milk_collection.NUM_DAY)
+
+
+def generate_instance(num_farms, everyday_ratio=0.5, capacity=80,
+                      radius=None, seed=0):
+    rng = np.random.default_rng(seed)
+    radius = radius or 3 * math.sqrt(num_farms)
+    east = np.round(rng.uniform(-radius, radius, num_farms))
+    north = np.round(rng.uniform(-radius, radius, num_farms))
+    east[0] = north[0] = 0
+    collection = rng.integers(3, 9, num_farms)
+    collection[0] = 0
+    num_everyday = max(1, int(num_farms * everyday_ratio))
+    # the busier day carries the every-day farms and half the others, with
+    # some slack for the split of the every-other-day farms
+    load = collection[:num_everyday].sum() + collection[num_everyday:].sum() / 2
+    num_vehicles = int(math.ceil(1.1 * load / capacity))
+    return MilkInstance(east, north, collection, num_everyday, capacity,
+                        num_vehicles)
+
+
+def routing_nodes(inst):
+    # every-day farms get one copy per day, the others a single node that
+    # any day's tanker can take
+    everyday = np.arange(1, inst.num_everyday)
+    other = np.arange(inst.num_everyday, inst.num_farms)
+    node_farm = np.concatenate([[0]] + [everyday] * inst.num_day + [other])
+    node_day = np.concatenate([[-1]] + [np.full(len(everyday), k)
+                                        for k in range(inst.num_day)] +
+                              [np.full(len(other), -1)])
+    return node_farm, node_day
+
+
+def solve_routing(inst, first_solution="PARALLEL_CHEAPEST_INSERTION",
+                  local_search="GUIDED_LOCAL_SEARCH", time_limit=10):
+    node_farm, node_day = routing_nodes(inst)
+    num_node = len(node_farm)
+    num_vehicles = inst.num_vehicles * inst.num_day
+    manager = pywrapcp.RoutingIndexManager(num_node, num_vehicles, 0)
+    routing = pywrapcp.RoutingModel(manager)
+
+    dist = DistanceMatrix.from_points(inst.east[node_farm],
+                                      inst.north[node_farm]).data
+    dist = np.round(dist * DIST_SCALE).astype(np.int64)
+    transit = routing.RegisterTransitMatrix(dist.tolist())
+    routing.SetArcCostEvaluatorOfAllVehicles(transit)
+
+    demand = routing.RegisterUnaryTransitVector(
+        inst.collection[node_farm].tolist())
+    routing.AddDimensionWithVehicleCapacity(
+        demand, 0, [int(inst.capacity)] * num_vehicles, True, "Capacity")
+
+    for node in np.flatnonzero(node_day >= 0).tolist():
+        k = int(node_day[node])
+        vehicle = routing.VehicleVar(manager.NodeToIndex(node))
+        vehicle.SetRange(k * inst.num_vehicles, (k + 1) * inst.num_vehicles - 1)
+
+    params = pywrapcp.DefaultRoutingSearchParameters()
+    params.first_solution_strategy = getattr(
+        routing_enums_pb2.FirstSolutionStrategy, first_solution)
+    params.local_search_metaheuristic = getattr(
+        routing_enums_pb2.LocalSearchMetaheuristic, local_search)
+    params.time_limit.FromMilliseconds(int(time_limit * 1000))
+    solution = routing.SolveWithParameters(params)
+    if solution is None:
+        raise ValueError("no routing solution found")
+
+    # routes[k][v] lists the farms tanker v visits on day k
+    routes = []
+    total = 0.0
+    for k in range(inst.num_day):
+        day_routes = []
+        for v in range(k * inst.num_vehicles, (k + 1) * inst.num_vehicles):
+            index = solution.Value(routing.NextVar(routing.Start(v)))
+            route = []
+            while not routing.IsEnd(index):
+                route.append(int(node_farm[manager.IndexToNode(index)]))
+                index = solution.Value(routing.NextVar(index))
+            day_routes.append(route)
+            total += route_length(inst, route)
+        routes.append(day_routes)
+    return total, routes
+
+
+def route_length(inst, route):
+    if not route:
+        return 0.0
+    farms = np.array([0] + route + [0])
+    return float(np.hypot(np.diff(inst.east[farms]),
+                          np.diff(inst.north[farms])).sum())
+
+
+def run():
+    inst = MilkInstance.default()
+    total, routes = solve_routing(inst, time_limit=5)
+    print("Total Dist %f" % total)
+    for k, day_routes in enumerate(routes):
+        print("Day %d" % k)
+        for route in day_routes:
+            print([x + 1 for x in route])
+            print("Collection %d" % inst.collection[route].sum())
+
+
+if __name__ == '__main__':
+    run()
@@ -1,100 +1,68 @@
+import numpy as np
 from ortools.linear_solver import pywraplp
 
+from lp.builder import ModelBuilder
+from model.params import Params
 
-def print_solver(solver):
-    print('Number of variables = %d' % solver.NumVariables())
-    print('Number of constraints = %d' % solver.NumConstraints())
-    print("Optimal objective value = %f" % solver.Objective().Value())
-
-
-def print_variable(variables, mine, year):
-    for i in range(mine):
-        out = "Mine %d:" % i
-        for t in range(year):
-            var = variables[(i, t)]
-            out += "\t%.3f" % var.solution_value()
-        print(out)
 
-
-def print_year_var(variables, year):
-    out = "Year:"
-    for t in range(year):
-        var = variables[t]
-        out += "\t%.3f" % var.solution_value()
-    print(out)
-
-
-def run():
-    # Solver
-    solver = pywraplp.Solver('mining',
-                             pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
-    # Context
-    num_mine = 4
+class MiningParams(Params):
     num_year = 5
     year_cost = [5, 4, 4, 5]  # million
     max_mine = [2, 2.5, 1.3, 3]  # million
-    max_total = sum(max_mine)
     mine_quality = [1.0, 0.7, 1.5, 0.5]
     year_quality = [0.9, 0.8, 1.2, 0.6, 1.0]
+    max_open = 3
+    price = 10
+    discount = 0.9
 
-    # Variable
-    delta = {}
-    gamma = {}
-    x0 = {}
-    for i in range(num_mine):
-        for t in range(num_year):
-            delta[(i, t)] = solver.BoolVar("d_%d_%d" % (i, t))
-            gamma[(i, t)] = solver.BoolVar("g_%d_%d" % (i, t))
-            x0[(i, t)] = solver.NumVar(0, max_mine[i], "x_%d_%d" % (i, t))
-    qt = {}
-    for t in range(num_year):
-        qt[t] = solver.NumVar(0, max_total, "q_%d" % t)
 
-    # Constraint
-    for i in range(num_mine):
-        for t in range(num_year):
-            solver.Add(x0[(i, t)] <= max_mine[i] * delta[(i, t)], "c1_%d_%d" % (i, t))
+def print_solver(solver):
+    print('Number of variables = %d' % solver.NumVariables())
+    print('Number of constraints = %d' % solver.NumConstraints())
+    print("Optimal objective value = %f" % solver.Objective().Value())
 
-    # open at most 3 mines every year
-    for t in range(num_year):
-        s = 0
-        for i in range(num_mine):
-            s += delta[(i, t)]
-        solver.Add(s <= 3, "c2_%d" % t)
 
-    # consistency
-    for i in range(num_mine):
-        for t in range(num_year):
-            solver.Add(delta[(i, t)] <= gamma[(i, t)], "c3_%d_%d" % (i, t))
+def build_model(builder, params=None):
+    p = params or MiningParams()
+    num_mine = len(p.max_mine)
+    num_year = p.num_year
+    max_mine = np.reshape(p.max_mine, (-1, 1))
 
-    for i in range(num_mine):
-        for t in range(num_year - 1):
-            solver.Add(gamma[(i, t + 1)] <= gamma[(i, t)], "c4_%d_%d" % (i, t))
+    # Variable
+    delta = builder.bool_var((num_mine, num_year), name="d")
+    gamma = builder.bool_var((num_mine, num_year), name="g")
+    x0 = builder.var((num_mine, num_year), 0, max_mine, name="x")
+    qt = builder.var(num_year, 0, max_mine.sum(), name="q")
 
+    # Constraint
+    builder.add(x0 <= delta * max_mine, "c1")
+    # open at most max_open mines every year
+    builder.add(delta.sum(axis=0) <= p.max_open, "c2")
+    # consistency
+    builder.add(delta <= gamma, "c3")
+    builder.add(gamma[:, 1:] <= gamma[:, :-1], "c4")
     # year output
-    for t in range(num_year):
-        s = sum(x0[(i, t)] for i in range(num_mine))
-        solver.Add(s == qt[t], "c5_%d" % t)
-
+    builder.add(x0.sum(axis=0) == qt, "c5")
     # blend quality
-    for t in range(num_year):
-        s = sum(x0[(i, t)] * mine_quality[i] for i in range(num_mine))
-        solver.Add(s == qt[t] * year_quality[t], "c6_%d" % t)
+    builder.add(x0.dot(np.reshape(p.mine_quality, (-1, 1)), axis=0) ==
+                qt * np.asarray(p.year_quality, dtype=float), "c6")
 
     # Object
-    obj = 0
-    for t in range(num_year):
-        rate = 0.9 ** t
-        for i in range(num_mine):
-            obj -= rate * year_cost[i] * gamma[(i, t)]
-        obj += 10 * rate * qt[t]
-    solver.Maximize(obj)
-    solver.Solve()
-    print_solver(solver)
-    # print_variable(delta, num_mine, num_year)
-    # print_variable(gamma, num_mine, num_year)
-    print_variable(x0, num_mine, num_year)
-    print_year_var(qt, num_year)
+    rate = p.discount ** np.arange(num_year)
+    cost = np.reshape(p.year_cost, (-1, 1)) * rate
+    builder.maximize(p.price * qt.dot(rate) - gamma.dot(cost, axis=None))
+    return {"delta": delta, "gamma": gamma, "x0": x0, "qt": qt}
+
+
+def run():
+    builder = ModelBuilder('mining')
+    plan = build_model(builder)
+    builder.solve(pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
+    print_solver(builder.solver)
+    x0 = plan["x0"].value()
+    for i in range(x0.shape[0]):
+        print("Mine %d:" % i + "".join("\t%.3f" % v for v in x0[i]))
+    print("Year:" + "".join("\t%.3f" % v for v in plan["qt"].value()))
 
 
 if __name__ == '__main__':
@@ -1,4 +1,10 @@
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 from ortools.linear_solver import pywraplp
+from scipy import sparse
 
 from util import reduce
 
@@ -34,33 +40,188 @@ def get_rev_idx(idxs):
     return rev
 
 
-def optimize_constraint(coefficients, rhs):
-    num = len(coefficients)
-    sign = [1 if x > 1 else -1 for x in coefficients]
+def canonical_row(coefficients, rhs):
+    # flip negative coefficients and sort them in descending order
+    sign = [1 if x >= 0 else -1 for x in coefficients]
     rhs_new = rhs - sum(x for x in coefficients if x < 0)
     coef_new = [abs(x) for x in coefficients]
     idxs = argsort(coef_new)
-    coef_sort = [coef_new[i] for i in idxs]
+    coef_sort = tuple(coef_new[i] for i in idxs)
+    return (coef_sort, rhs_new), idxs, sign
+
+
+def recover_row(arr, a0, idxs, sign):
+    num = len(idxs)
     rev_idxs = get_rev_idx(idxs)
+    coef_rev = [arr[i] for i in rev_idxs]
+    coef_rev = [coef_rev[i] * sign[i] for i in range(num)]
+    rhs_rev = a0 + sum(x for x in coef_rev if x < 0)
+    return coef_rev, rhs_rev
 
-    def recover_constraint(arr, a0):
-        coef_rev = [arr[i] for i in rev_idxs]
-        coef_rev = [coef_rev[i] * sign[i] for i in range(num)]
-        rhs_rev = a0 + sum(x for x in coef_rev if x < 0)
-        return coef_rev, rhs_rev
 
+def optimize_constraint(coefficients, rhs):
+    (coef_sort, rhs_new), idxs, sign = canonical_row(coefficients, rhs)
     coef_opt, rhs_opt = reduce_coef(coef_sort, rhs_new)
-    coef_opt_rev, rhs_opt_rev = recover_constraint(coef_opt, rhs_opt)
+    coef_opt_rev, rhs_opt_rev = recover_row(coef_opt, rhs_opt, idxs, sign)
     print("positive ordered inequality")
     print_constraint(coef_sort, rhs_new)
     print_constraint(coef_opt, rhs_opt)
     return coef_opt_rev, rhs_opt_rev
 
 
-def reduce_coef(a, a0):
-    ceilings = reduce.find_ceilings(a, a0)
-    roofs = reduce.find_roofs(a, a0)
-    return solve_reduce_prob(len(a), ceilings, roofs, a0)
+class ReduceCache(object):
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key):
+        if key not in self.data:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.data.move_to_end(key)
+        return self.data[key]
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+
+def reduce_key(key):
+    a, a0 = key
+    return reduce_coef(list(a), a0)
+
+
+def optimize_constraints(rows, cache=None, workers=None):
+    # rows is a list of (coefficients, rhs), identical canonical rows are
+    # reduced once and reused through the cache
+    if cache is None:
+        cache = ReduceCache()
+    canon = [canonical_row(coefficients, rhs) for coefficients, rhs in rows]
+    # results of this batch, kept apart from the lru which may evict keys
+    # of the batch while it fills
+    found = {}
+    missing = []
+    for key, _, _ in canon:
+        if key in found:
+            continue
+        value = cache.get(key) if key in cache else None
+        found[key] = value
+        if value is None:
+            missing.append(key)
+    if workers == 1 or len(missing) <= 1:
+        solved = [reduce_key(key) for key in missing]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            solved = list(executor.map(reduce_key, missing))
+    found.update(zip(missing, solved))
+    results = []
+    for key, idxs, sign in canon:
+        coef_opt, rhs_opt = found[key]
+        results.append(recover_row(coef_opt, rhs_opt, idxs, sign))
+    for key, value in zip(missing, solved):
+        cache.put(key, value)
+    stats = {
+        "rows": len(rows),
+        "solved": len(missing),
+        "hits": len(canon) - len(missing),
+        "cache_size": len(cache.data),
+    }
+    return results, stats
+
+
+def reduce_coef(a, a0, backend="clp"):
+    ceilings = list(reduce.iter_ceilings(a, a0))
+    roofs = list(reduce.iter_roofs(a, a0))
+    a_ub, b_ub = reduce_matrix(len(a), ceilings, roofs)
+    return solve_reduce_matrix(a_ub, b_ub, a0, backend)
+
+
+def mask_entries(masks, num_var):
+    # row and column index of every set bit, row k is masks[k]
+    if num_var < 64:
+        arr = np.array(masks, dtype=np.uint64).reshape(-1, 1)
+        bits = (arr >> np.arange(num_var, dtype=np.uint64)) & np.uint64(1)
+        return np.nonzero(bits)
+    rows = []
+    cols = []
+    for k, mask in enumerate(masks):
+        sub = reduce.to_list(mask)
+        rows.extend([k] * len(sub))
+        cols.extend(sub)
+    return np.array(rows, dtype=int), np.array(cols, dtype=int)
+
+
+def reduce_matrix(num_var, ceilings, roofs):
+    # A_ub x <= b_ub over x = (b_1, ..., b_n, b0) with
+    #   b_{i+1} - b_i <= 0
+    #   sum(b_i for i in ceiling) - b0 <= 0
+    #   b0 - sum(b_i for i in roof) <= -1
+    num_order = num_var - 1
+    num_ceil = len(ceilings)
+    num_roof = len(roofs)
+    order = np.arange(num_order)
+    ceil_row, ceil_col = mask_entries(ceilings, num_var)
+    roof_row, roof_col = mask_entries(roofs, num_var)
+    ceil_row = ceil_row + num_order
+    roof_row = roof_row + num_order + num_ceil
+    ceil_b0 = np.arange(num_ceil) + num_order
+    roof_b0 = np.arange(num_roof) + num_order + num_ceil
+    rows = np.concatenate([order, order, ceil_row, ceil_b0, roof_row, roof_b0])
+    cols = np.concatenate([order + 1, order, ceil_col,
+                           np.full(num_ceil, num_var), roof_col,
+                           np.full(num_roof, num_var)])
+    vals = np.concatenate([np.ones(num_order), -np.ones(num_order),
+                           np.ones(len(ceil_col)), -np.ones(num_ceil),
+                           -np.ones(len(roof_col)), np.ones(num_roof)])
+    num_row = num_order + num_ceil + num_roof
+    a_ub = sparse.csr_matrix((vals, (rows, cols)),
+                             shape=(num_row, num_var + 1))
+    b_ub = np.zeros(num_row)
+    b_ub[num_order + num_ceil:] = -1
+    return a_ub, b_ub
+
+
+def solve_reduce_matrix(a_ub, b_ub, upper, backend="clp"):
+    num_var = a_ub.shape[1] - 1
+    c = np.ones(num_var + 1)
+    c[num_var] = 0
+    if backend == "highs":
+        from scipy.optimize import linprog
+        res = linprog(c, A_ub=a_ub, b_ub=b_ub, bounds=(0, upper),
+                      method="highs")
+        if res.status != 0:
+            raise ValueError("reduce LP failed: %s" % res.message)
+        x = res.x.tolist()
+    elif backend == "clp":
+        solver = pywraplp.Solver('optimize_constraint',
+                                 pywraplp.Solver.CLP_LINEAR_PROGRAMMING)
+        x_var = [solver.NumVar(0, upper, "b_%d" % i) for i in range(num_var)]
+        x_var.append(solver.NumVar(0, upper, "b0"))
+        objective = solver.Objective()
+        for i in range(num_var):
+            objective.SetCoefficient(x_var[i], 1)
+        objective.SetMinimization()
+        infinity = solver.Infinity()
+        indptr = a_ub.indptr.tolist()
+        indices = a_ub.indices.tolist()
+        data = a_ub.data.tolist()
+        for k, ub in enumerate(b_ub.tolist()):
+            ct = solver.Constraint(-infinity, ub)
+            for p in range(indptr[k], indptr[k + 1]):
+                ct.SetCoefficient(x_var[indices[p]], data[p])
+        solver.Solve()
+        x = [v.solution_value() for v in x_var]
+    else:
+        raise ValueError("unknown backend %s" % backend)
+    return list(x[:num_var]), x[num_var]
 
 
 def solve_reduce_prob(num_var, ceilings, roofs, upper):
@@ -139,5 +300,28 @@ def run1():
         print_constraint(bi, b0)
 
 
+def run2():
+    rows = [
+        ([8, 12, 13, 64, 22, 41], 80),
+        ([41, 22, 64, 13, 12, 8], 80),
+        ([-8, 12, 13, 64, -22, 41], 50),
+        ([3, 6, 4, 18, 6, 4], 20),
+        ([4, 6, 18, 4, 6, 3], 20),
+        ([3, 2, 4, 8, 8, 4], 24),
+    ]
+    cache = ReduceCache()
+    results, stats = optimize_constraints(rows * 50, cache)
+    for (ai, a0), (bi, b0) in zip(rows, results):
+        print_constraint(ai, a0)
+        print_constraint(bi, b0)
+    print(stats)
+    _, stats = optimize_constraints(rows, cache)
+    print(stats)
+
+
 if __name__ == '__main__':
-    run1()
+    # the cached batch reduction with "batch", one row at a time otherwise
+    if sys.argv[1:] == ["batch"]:
+        run2()
+    else:
+        run1()
@@ -0,0 +1,25 @@
+import copy
+
+
+class Params(object):
+    # defaults are class attributes, keyword arguments override them
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            if not hasattr(type(self), key) or key.startswith("_"):
+                raise AttributeError("%s has no parameter %s" %
+                                     (type(self).__name__, key))
+            setattr(self, key, copy.deepcopy(value))
+
+    @classmethod
+    def names(cls):
+        return sorted(k for k in dir(cls)
+                      if not k.startswith("_") and
+                      not callable(getattr(cls, k)))
+
+    def replace(self, **kwargs):
+        params = copy.deepcopy(self)
+        params.__init__(**kwargs)
+        return params
+
+    def to_dict(self):
+        return dict((k, getattr(self, k)) for k in self.names())
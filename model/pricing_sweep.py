@@ -0,0 +1,228 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import osqp
+
+from model import agricultural_pricing
+from model.agricultural_pricing import PricingModel
+
+# parameters a grid point may set, each as one vector per point
+PARAMS = ["last_demand", "elasticities", "limits"]
+
+SETTINGS = {"verbose": False}
+# tight enough that a check compares the models, not the tolerances
+CHECK_SETTINGS = {"verbose": False, "polish": True, "eps_abs": 1e-9,
+                  "eps_rel": 1e-9}
+
+
+def default_base():
+    m = agricultural_pricing
+    return (m.LAST_DEMAND, m.LAST_PRICE, m.ELASTICITIES,
+            m.CROSS_ELASTICITIES, m.COMPOSITIONS, m.COMPONENT_LIMIT)
+
+
+def product_grid(**axes):
+    # every combination of the vectors given per parameter, axes[k] holds
+    # one row per value of parameter k and later axes vary fastest
+    names = list(axes)
+    values = [np.atleast_2d(np.asarray(axes[k], dtype=float)) for k in names]
+    index = np.meshgrid(*[np.arange(len(v)) for v in values], indexing="ij")
+    return dict((k, v[i.reshape(-1)]) for k, v, i in zip(names, values, index))
+
+
+# the model each pool worker sets up once and updates for every point
+worker_model = None
+worker_base = None
+
+
+def init_worker(base, settings):
+    global worker_model, worker_base
+    worker_model = PricingModel(*base, **settings)
+    worker_base = {"last_demand": np.asarray(base[0], dtype=float),
+                   "elasticities": np.asarray(base[2], dtype=float)}
+
+
+def solve_chunk(start, points):
+    model = worker_model
+    num = len(next(iter(points.values())))
+    out = {
+        "price": np.full((num, model.num_products), np.nan),
+        "revenue": np.full(num, np.nan),
+        "status": np.zeros(num, dtype=np.int16),
+        "iter": np.zeros(num, dtype=np.int32),
+    }
+    # a point solves as a fresh setup at its demand and elasticities would,
+    # so new ones cost a refactorization and points sharing them run back
+    # to back; the limits are a vector update
+    market = [k for k in ["last_demand", "elasticities"] if k in points]
+    order = np.arange(num)
+    if market:
+        _, group = np.unique(np.hstack([points[k] for k in market]), axis=0,
+                             return_inverse=True)
+        group = group.reshape(-1)
+        order = np.argsort(group, kind="stable")
+    current = None
+    for k in order.tolist():
+        if market and group[k] != current:
+            model.update_market(**dict(
+                (name, points[name][k] if name in points else value)
+                for name, value in worker_base.items()))
+            current = group[k]
+        if "limits" in points:
+            model.update(limits=points["limits"][k])
+        price = model.solve()
+        out["status"][k] = model.result.info.status_val
+        out["iter"][k] = model.result.info.iter
+        out["price"][k] = price
+        out["revenue"][k] = price.dot(model.demand(price))
+    return start, out
+
+
+def fresh_point(points, k, base=None, settings=SETTINGS):
+    # point k solved on its own fresh setup
+    base = list(base or default_base())
+    for name, i in [("last_demand", 0), ("elasticities", 2),
+                    ("limits", 5)]:
+        if name in points:
+            base[i] = points[name][k]
+    model = PricingModel(*base, **settings)
+    price = model.solve()
+    return model.result.info.status_val, price
+
+
+def iter_sweep(points, base=None, workers=None, chunk_size=1000,
+               settings=SETTINGS):
+    # yields (start, columns) per chunk of points, in order
+    unknown = set(points) - set(PARAMS)
+    if unknown:
+        raise ValueError("unknown parameters %s" % ", ".join(sorted(unknown)))
+    base = base or default_base()
+    num = len(next(iter(points.values())))
+    starts = range(0, num, chunk_size)
+    chunks = [dict((k, v[s:s + chunk_size]) for k, v in points.items())
+              for s in starts]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        init_worker(base, settings)
+        for s, chunk in zip(starts, chunks):
+            yield solve_chunk(s, chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(base, settings)) as executor:
+        for result in executor.map(solve_chunk, starts, chunks):
+            yield result
+
+
+def check_sweep(points, indices, base=None, settings=CHECK_SETTINGS):
+    # largest price difference between the sweep and a fresh setup over
+    # the points at indices that both solve, and the number of those
+    sub = dict((k, v[indices]) for k, v in points.items())
+    solved = osqp.constant("OSQP_SOLVED")
+    diff = 0.0
+    num = 0
+    for start, out in iter_sweep(sub, base, 1, len(indices), settings):
+        for k in range(len(out["price"])):
+            status, price = fresh_point(sub, start + k, base, settings)
+            if status != solved or out["status"][k] != solved:
+                continue
+            diff = max(diff, np.abs(out["price"][k] - price).max())
+            num += 1
+    return diff, num
+
+
+def write_npz(path, points, results):
+    # the columns fill in place, the inputs are stored next to them
+    columns = None
+    num = len(next(iter(points.values())))
+    for start, out in results:
+        if columns is None:
+            columns = dict((k, np.empty((num,) + v.shape[1:], dtype=v.dtype))
+                           for k, v in out.items())
+        for k, v in out.items():
+            columns[k][start:start + len(v)] = v
+    columns.update(points)
+    np.savez(path, **columns)
+
+
+def write_csv(path, points, results):
+    # one row per point, vectors spread over name_0, name_1, ...
+    with open(path, "w") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        header = None
+        for start, out in results:
+            num = len(out["revenue"])
+            parts = [points[k][start:start + num] for k in points] + \
+                [out["price"], out["revenue"]]
+            if header is None:
+                header = ["point"]
+                for name, part in zip(list(points) + ["price", "revenue"],
+                                      parts):
+                    header.extend([name] if part.ndim == 1 else
+                                  ["%s_%d" % (name, i)
+                                   for i in range(part.shape[1])])
+                writer.writerow(header + ["status", "iter"])
+            table = np.column_stack(parts).tolist()
+            for i, row, status, it in zip(range(start, start + num), table,
+                                          out["status"].tolist(),
+                                          out["iter"].tolist()):
+                writer.writerow([i] + row + [status, it])
+
+
+def axis(values):
+    # lo hi num
+    lo, hi, num = values
+    return np.linspace(float(lo), float(hi), int(num))
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        description="Pricing optima over a grid of parameter scales")
+    parser.add_argument("--demand-scale", nargs=3, default=[0.9, 1.1, 10])
+    parser.add_argument("--elasticity-scale", nargs=3,
+                        default=[0.8, 1.2, 10])
+    parser.add_argument("--fat", nargs=3, default=[500, 700, 10],
+                        help="fat limit lo hi num")
+    parser.add_argument("--dry", nargs=3, default=[650, 850, 10],
+                        help="dry matter limit lo hi num")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--out", default="pricing_sweep.npz",
+                        help=".npz or .csv")
+    parser.add_argument("--check", type=int, default=5,
+                        help="points compared against a fresh setup")
+    args = parser.parse_args()
+
+    base = default_base()
+    limits = np.array(np.meshgrid(axis(args.fat), axis(args.dry),
+                                  indexing="ij")).reshape(2, -1).T
+    points = product_grid(
+        last_demand=np.outer(axis(args.demand_scale), base[0]),
+        elasticities=np.outer(axis(args.elasticity_scale), base[2]),
+        limits=limits)
+
+    start = time.time()
+    results = iter_sweep(points, base, args.workers, args.chunk_size)
+    if args.out.endswith(".csv"):
+        write_csv(args.out, points, results)
+    else:
+        write_npz(args.out, points, results)
+    print("%d points in %.2fs to %s" % (
+        len(points["limits"]), time.time() - start, args.out),
+        file=sys.stderr)
+    if args.check:
+        rng = np.random.default_rng(0)
+        indices = rng.choice(len(points["limits"]),
+                             min(args.check, len(points["limits"])),
+                             replace=False)
+        diff, num = check_sweep(points, indices, base)
+        print("max price diff to a fresh setup over %d solved of %d "
+              "points: %.2e" % (num, len(indices), diff), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    run()
@@ -1,5 +1,17 @@
+import numpy as np
 from ortools.linear_solver import pywraplp
 
+# number of acids and the hydrophobic ones
+SEQUENCES = {
+    "run0": (27, [2, 3, 4, 6, 9,
+                  11, 14, 16, 19, 22,
+                  23, 26]),
+    "run1": (50, [2, 4, 5, 6, 11,
+                  12, 17, 20, 21, 25,
+                  27, 28, 30, 31, 33,
+                  37, 44, 46]),
+}
+
 
 def print_solver(solver):
     print('Number of variables = %d' % solver.NumVariables())
@@ -9,7 +21,7 @@ def print_solver(solver):
     print("Iterations = %d" % solver.iterations())
 
 
-def fold_protein(num_acids, hydrophobic_acids):
+def build_fold_model(num_acids, hydrophobic_acids):
     # Solver
     solver = pywraplp.Solver('protein_folding',
                              pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING)
@@ -33,6 +45,9 @@ def fold_protein(num_acids, hydrophobic_acids):
     for i, j in x:
         mid = (i + j - 1) / 2
         for k in range(i, j):
+            # no fold after the first or before the last acid
+            if k not in y:
+                continue
             if k != mid:
                 expr = x[(i, j)] + y[k] <= 1
             else:
@@ -42,24 +57,88 @@ def fold_protein(num_acids, hydrophobic_acids):
     # Object
     obj = sum(x[k] for k in x)
     solver.Maximize(obj)
+    return solver, y
 
-    # Solve
-    solver.Solve()
-    print_solver(solver)
 
-    def print_folding():
-        fold_idx = []
-        for cur in y:
-            if y[cur].solution_value() != 0:
-                print("fold", cur)
-                fold_idx.append(cur)
-        print_folds(num_acids, hydrophobic_acids, fold_idx)
+def solve_fold_model(num_acids, hydrophobic_acids, time_limit=None):
+    # returns the objective, the folds and the solver
+    solver, y = build_fold_model(num_acids, hydrophobic_acids)
+    if time_limit is not None:
+        solver.SetTimeLimit(int(time_limit * 1000))
+    solver.Solve()
+    folds = [cur for cur in y if y[cur].solution_value() > 0.5]
+    return int(round(solver.Objective().Value())), folds, solver
 
-    print_folding()
 
+def fold_protein(num_acids, hydrophobic_acids):
+    _, fold_idx, solver = solve_fold_model(num_acids, hydrophobic_acids)
+    print_solver(solver)
+    for cur in fold_idx:
+        print("fold", cur)
+    print_folds(num_acids, hydrophobic_acids, fold_idx)
     return solver
 
 
+def fold_pairs(num_acids, hydrophobic_acids):
+    # pairs[f] counts the hydrophobic pairs (f - d, f + 1 + d), d >= 1, that
+    # meet across a fold after acid f and reach[f] is the largest such d
+    n = num_acids
+    hydrophobic = np.zeros(n + 2, dtype=bool)
+    hydrophobic[np.asarray(hydrophobic_acids, dtype=int)] = True
+    pairs = np.zeros(n + 1, dtype=np.int64)
+    reach = np.zeros(n + 1, dtype=np.int64)
+    for f in range(2, n - 1):
+        d = np.arange(1, min(f, n - f))
+        meet = d[hydrophobic[f - d] & hydrophobic[f + 1 + d]]
+        if len(meet):
+            pairs[f] = len(meet)
+            reach[f] = meet[-1]
+    return pairs, reach
+
+
+def check_folds(num_acids, hydrophobic_acids, folds):
+    # the objective of the folds in the MIP, None if they break it
+    pairs, reach = fold_pairs(num_acids, hydrophobic_acids)
+    folds = sorted(folds)
+    if any(f < 2 or f > num_acids - 2 for f in folds):
+        return None
+    for p, f in zip(folds, folds[1:]):
+        if f - p <= max(reach[p], reach[f]):
+            return None
+    return int(pairs[folds].sum())
+
+
+def fold_dp(num_acids, hydrophobic_acids):
+    # in the MIP a fold after acid f matches all pairs around it, x == y,
+    # so no other fold may lie within reach[f] of f. the folds are a chain
+    # where p < f follow each other iff f - p > max(reach[p], reach[f]) and
+    #   best[f] = pairs[f] + max(0, best[p] over those p)
+    # is the most matches with f the last fold; O(n^2) time, O(n) memory
+    n = num_acids
+    pairs, reach = fold_pairs(n, hydrophobic_acids)
+    best = np.zeros(n + 1, dtype=np.int64)
+    prev = np.full(n + 1, -1)
+    for f in range(2, n - 1):
+        # folds without pairs never add a match
+        if pairs[f] == 0:
+            continue
+        p = np.arange(2, f)
+        ok = (f - p > reach[p]) & (f - p > reach[f]) & (pairs[p] > 0)
+        if ok.any():
+            k = np.argmax(np.where(ok, best[p], -1))
+            best[f] = pairs[f] + best[p[k]]
+            prev[f] = p[k]
+        else:
+            best[f] = pairs[f]
+    if best.max() == 0:
+        return 0, []
+    folds = [int(best.argmax())]
+    while prev[folds[-1]] >= 0:
+        folds.append(int(prev[folds[-1]]))
+    folds.reverse()
+    return int(best.max()), folds
+
+
 def print_folds(num_acids, hydrophobic_acids, folds):
     str_nil = " "
     str_neg = "*"
@@ -121,10 +200,7 @@ def calc_offset(num, folds):
 
 def run0():
     # Context
-    num_acids = 27
-    hydrophobic_acids = [2, 3, 4, 6, 9,
-                         11, 14, 16, 19, 22,
-                         23, 26]
+    num_acids, hydrophobic_acids = SEQUENCES["run0"]
     # Optimal
     fold_protein(num_acids, hydrophobic_acids)
     # Reference
@@ -134,11 +210,7 @@ def run0():
 
 def run1():
     # Context
-    num_acids = 50
-    hydrophobic_acids = [2, 4, 5, 6, 11,
-                         12, 17, 20, 21, 25,
-                         27, 28, 30, 31, 33,
-                         37, 44, 46]
+    num_acids, hydrophobic_acids = SEQUENCES["run1"]
     # Optimal
     fold_protein(num_acids, hydrophobic_acids)
     # Reference
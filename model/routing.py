@@ -0,0 +1,103 @@
+import numpy as np
+from ortools.sat.python import cp_model
+
+# CP-SAT only takes integer costs
+DIST_SCALE = 1000
+
+
+def add_tour(model, num_node, visit=None, prefix="x"):
+    # one circuit through every node whose visit literal is true, a node with
+    # visit None is always on the tour; returns the arc literals by (i, j)
+    arcs = {}
+    circuit = []
+    for i in range(num_node):
+        for j in range(num_node):
+            if i == j:
+                continue
+            lit = model.NewBoolVar("%s_%d_%d" % (prefix, i, j))
+            arcs[(i, j)] = lit
+            circuit.append((i, j, lit))
+        if visit is not None and visit[i] is not None:
+            circuit.append((i, i, visit[i].Not()))
+    model.AddCircuit(circuit)
+    return arcs
+
+
+def add_routes(model, num_node, prefix="x"):
+    # any number of circuits through node 0 that together visit every node
+    arcs = {}
+    circuit = []
+    for i in range(num_node):
+        for j in range(num_node):
+            if i == j:
+                continue
+            lit = model.NewBoolVar("%s_%d_%d" % (prefix, i, j))
+            arcs[(i, j)] = lit
+            circuit.append((i, j, lit))
+    model.AddMultipleCircuit(circuit)
+    return arcs
+
+
+def tour_cost(arcs, dist, open_end=False, scale=DIST_SCALE):
+    # dist is a DistanceMatrix; with open_end the arcs back to node 0 are
+    # free, so the tour is a path
+    keys = [key for key in arcs if not (open_end and key[1] == 0)]
+    tails, heads = np.array(keys).T
+    costs = np.round(dist.lookup(tails, heads) * scale).astype(int)
+    return cp_model.LinearExpr.WeightedSum([arcs[key] for key in keys],
+                                           costs.tolist())
+
+
+def extract_tour(solver, arcs, start=0):
+    succ = {}
+    for (i, j), lit in arcs.items():
+        if solver.BooleanValue(lit):
+            succ[i] = j
+    if start not in succ:
+        return []
+    tour = [start]
+    cur = succ[start]
+    while cur != start:
+        tour.append(cur)
+        cur = succ[cur]
+    return tour
+
+
+def extract_routes(solver, arcs, depot=0):
+    succ = {}
+    routes = []
+    for (i, j), lit in arcs.items():
+        if not solver.BooleanValue(lit):
+            continue
+        if i == depot:
+            routes.append([depot, j])
+        else:
+            succ[i] = j
+    for route in routes:
+        while route[-1] != depot:
+            route.append(succ[route[-1]])
+        route.pop()
+    return routes
+
+
+def tour_length(tour, dist, open_end=False):
+    if len(tour) < 2:
+        return 0
+    legs = list(zip(tour, tour[1:]))
+    if not open_end:
+        legs.append((tour[-1], tour[0]))
+    return sum(dist(i, j) for i, j in legs)
+
+
+def solve(model, time_limit=None, workers=None):
+    solver = cp_model.CpSolver()
+    # the LP relaxation of the circuit gives the bound that closes the search
+    solver.parameters.linearization_level = 2
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = time_limit
+    if workers is not None:
+        solver.parameters.num_workers = workers
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        raise ValueError("no tour found: %s" % solver.StatusName(status))
+    return solver, solver.StatusName(status)
@@ -0,0 +1,270 @@
+import argparse
+import csv
+import importlib
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from lp.builder import ModelBuilder
+from lp.mps import load_mps
+
+# model name -> (module, parameters class)
+MODELS = {
+    "farm": ("model.farm", "FarmParams"),
+    "mining": ("model.mining", "MiningParams"),
+    "power_generation": ("model.power_generation", "PowerParams"),
+}
+
+SOLVERS = {
+    "cbc": pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING,
+    "scip": pywraplp.Solver.SCIP_MIXED_INTEGER_PROGRAMMING,
+}
+
+STATUS_NAMES = {
+    getattr(pywraplp.Solver, name): name
+    for name in ["OPTIMAL", "FEASIBLE", "INFEASIBLE", "UNBOUNDED",
+                 "ABNORMAL", "MODEL_INVALID", "NOT_SOLVED"]
+}
+
+
+def load_model(name):
+    module_name, params_name = MODELS[name]
+    module = importlib.import_module(module_name)
+    return module, getattr(module, params_name)
+
+
+def build_scenario(module, params):
+    # element names are only needed for debugging, skip them per scenario
+    builder = ModelBuilder(type(params).__name__, names=False)
+    module.build_model(builder, params)
+    return builder.to_mps_model()
+
+
+def coef_values(model, keys):
+    # values of model's matrix at the sorted keys row * num_cols + col,
+    # zero where the model has no entry
+    own = model.a_row.astype(np.int64) * model.num_cols + model.a_col
+    vals = np.zeros(len(keys))
+    vals[np.searchsorted(keys, own)] = model.a_val
+    return vals
+
+
+class ScenarioSession(object):
+    # keeps one solver across scenarios; each scenario only pushes the
+    # bounds and coefficients that differ from the model loaded last
+    def __init__(self, model, solver_type, warm_start=True):
+        self.solver = pywraplp.Solver(model.name, solver_type)
+        self.solver_type = solver_type
+        self.variables, self.constraints = load_mps(model, self.solver)
+        self.model = model
+        self.warm_start = warm_start
+        self.solution = None
+
+    def compatible(self, model):
+        return model.num_cols == self.model.num_cols and \
+            model.num_rows == self.model.num_rows
+
+    def update(self, model):
+        old = self.model
+        infinity = self.solver.Infinity()
+        changes = 0
+
+        lb = np.maximum(model.col_lb, -infinity)
+        ub = np.minimum(model.col_ub, infinity)
+        old_lb = np.maximum(old.col_lb, -infinity)
+        old_ub = np.minimum(old.col_ub, infinity)
+        for j in np.flatnonzero((lb != old_lb) | (ub != old_ub)).tolist():
+            self.variables[j].SetBounds(lb[j], ub[j])
+            changes += 1
+        for j in np.flatnonzero(model.col_int != old.col_int).tolist():
+            self.variables[j].SetInteger(bool(model.col_int[j]))
+            changes += 1
+
+        lb, ub = model.row_bounds(infinity)
+        old_lb, old_ub = old.row_bounds(infinity)
+        for i in np.flatnonzero((lb != old_lb) | (ub != old_ub)).tolist():
+            self.constraints[i].SetBounds(lb[i], ub[i])
+            changes += 1
+
+        objective = self.solver.Objective()
+        for j in np.flatnonzero(model.obj != old.obj).tolist():
+            objective.SetCoefficient(self.variables[j], model.obj[j])
+            changes += 1
+        if model.obj_offset != old.obj_offset:
+            objective.SetOffset(model.obj_offset)
+            changes += 1
+        if model.maximize != old.maximize:
+            objective.SetOptimizationDirection(model.maximize)
+            changes += 1
+
+        num_cols = model.num_cols
+        keys = np.union1d(
+            old.a_row.astype(np.int64) * num_cols + old.a_col,
+            model.a_row.astype(np.int64) * num_cols + model.a_col)
+        vals = coef_values(model, keys)
+        for k in np.flatnonzero(vals != coef_values(old, keys)).tolist():
+            self.constraints[keys[k] // num_cols].SetCoefficient(
+                self.variables[keys[k] % num_cols], vals[k])
+            changes += 1
+        self.model = model
+        return changes
+
+    def solve(self):
+        if self.warm_start and self.solution is not None:
+            if self.solver_type == SOLVERS["scip"]:
+                # scip takes a hint only before the problem is transformed,
+                # setting the sense again drops the last transformed problem
+                self.solver.Objective().SetOptimizationDirection(
+                    self.model.maximize)
+            self.solver.SetHint(self.variables, self.solution)
+        status = self.solver.Solve()
+        if status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+            self.solution = [x.solution_value() for x in self.variables]
+        return status
+
+
+def solve_shard(name, scenarios, solver="scip", warm_start=True):
+    # scenarios is a list of (index, overrides), solved in order
+    module, params_class = load_model(name)
+    session = None
+    results = []
+    for index, overrides in scenarios:
+        start = time.time()
+        model = build_scenario(module, params_class(**overrides))
+        build_time = time.time() - start
+        start = time.time()
+        rebuilt = session is None or not session.compatible(model)
+        if rebuilt:
+            session = ScenarioSession(model, SOLVERS[solver], warm_start)
+            changes = model.num_nonzeros
+        else:
+            changes = session.update(model)
+        load_time = time.time() - start
+        start = time.time()
+        status = session.solve()
+        solve_time = time.time() - start
+        solved = status in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)
+        results.append({
+            "scenario": index,
+            "params": overrides,
+            "status": STATUS_NAMES.get(status, str(status)),
+            "objective": session.solver.Objective().Value() if solved
+            else None,
+            "rebuilt": rebuilt,
+            "changes": changes,
+            "build_time": build_time,
+            "load_time": load_time,
+            "solve_time": solve_time,
+        })
+    return results
+
+
+def scenario_grid(choices):
+    # every combination of the given alternatives, later names vary fastest
+    names = list(choices)
+    return [dict(zip(names, values))
+            for values in itertools.product(*[choices[k] for k in names])]
+
+
+def run_sweep(name, scenarios, workers=None, shards=None, solver="scip",
+              warm_start=True):
+    _, params_class = load_model(name)
+    for overrides in scenarios:
+        # fail on a misspelt parameter before any worker starts
+        params_class(**overrides)
+    workers = workers or os.cpu_count() or 1
+    shards = max(1, min(shards or workers, len(scenarios)))
+    # neighbouring scenarios share a shard so each solver sees small steps
+    chunks = np.array_split(np.arange(len(scenarios)), shards)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(solve_shard, name,
+                                   [(i, scenarios[i]) for i in chunk.tolist()],
+                                   solver, warm_start)
+                   for chunk in chunks if len(chunk)]
+        for future in futures:
+            results.extend(future.result())
+    results.sort(key=lambda r: r["scenario"])
+    return results
+
+
+def write_table(results, out):
+    names = []
+    for r in results:
+        names.extend(k for k in r["params"] if k not in names)
+    fields = ["scenario"] + names + ["status", "objective", "rebuilt",
+                                     "changes", "build_time", "load_time",
+                                     "solve_time"]
+    writer = csv.DictWriter(out, fields, lineterminator="\n")
+    writer.writeheader()
+    for r in results:
+        row = dict((k, v) for k, v in r.items() if k != "params")
+        for k in names:
+            v = r["params"].get(k)
+            row[k] = json.dumps(v) if isinstance(v, (list, tuple)) else v
+        for k in ["build_time", "load_time", "solve_time"]:
+            row[k] = "%.4f" % row[k]
+        writer.writerow(row)
+
+
+def parse_choice(text):
+    # name=[alternative, ...] with the alternatives in json
+    name, _, values = text.partition("=")
+    values = json.loads(values)
+    if not isinstance(values, list):
+        values = [values]
+    return name, values
+
+
+def read_scenarios(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        description="Solve a planning model under many parameter scenarios")
+    parser.add_argument("model", choices=sorted(MODELS))
+    parser.add_argument("--set", action="append", default=[],
+                        type=parse_choice, metavar="NAME=[V, ...]",
+                        help="alternatives of one parameter, the grid is "
+                             "their product")
+    parser.add_argument("--scenarios",
+                        help="json lines file, one parameter dict per line")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--shards", type=int, default=None)
+    parser.add_argument("--solver", choices=sorted(SOLVERS), default="scip")
+    parser.add_argument("--cold", action="store_true",
+                        help="no solution hint from the previous scenario")
+    parser.add_argument("--out", help="csv file, stdout by default")
+    args = parser.parse_args()
+
+    scenarios = read_scenarios(args.scenarios) if args.scenarios else []
+    if args.set:
+        grid = scenario_grid(dict(args.set))
+        scenarios = [dict(s, **g) for s in scenarios or [{}] for g in grid]
+    scenarios = scenarios or [{}]
+
+    start = time.time()
+    results = run_sweep(args.model, scenarios, args.workers, args.shards,
+                        args.solver, not args.cold)
+    elapsed = time.time() - start
+    if args.out:
+        with open(args.out, "w") as f:
+            write_table(results, f)
+    else:
+        write_table(results, sys.stdout)
+    print("%s scenarios=%d solved=%d time=%.2fs" % (
+        args.model, len(results),
+        sum(r["objective"] is not None for r in results), elapsed),
+        file=sys.stderr)
+
+
+if __name__ == '__main__':
+    run()
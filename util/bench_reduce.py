@@ -0,0 +1,46 @@
+import random
+import time
+
+from util import reduce
+
+
+def count(it):
+    num = 0
+    for _ in it:
+        num += 1
+    return num
+
+
+def bench_row(name, a, a0):
+    start = time.time()
+    num_roof = count(reduce.iter_roofs(a, a0))
+    num_ceiling = count(reduce.iter_ceilings(a, a0))
+    lazy_time = time.time() - start
+    start = time.time()
+    roofs = reduce.find_roofs(a, a0)
+    ceilings = reduce.find_ceilings(a, a0)
+    list_time = time.time() - start
+    assert len(roofs) == num_roof and len(ceilings) == num_ceiling
+    print("%s n=%d roofs=%d ceilings=%d lazy=%.4fs list=%.4fs" % (
+        name, len(a), num_roof, num_ceiling, lazy_time, list_time))
+
+
+def run():
+    bench_row("test2", [23, 21, 19, 17, 14, 13, 13, 9], 70)
+    a0_list = [6, 5, 4, 6]
+    ai_list = [
+        [4, 2, 2, 1, 1, 1],
+        [5, 2, 2, 1, 1, 0],
+        [4, 1, 1, 1, 1, 1],
+        [2, 2, 1, 1, 1, 1],
+    ]
+    for i in range(len(a0_list)):
+        bench_row("test3[%d]" % i, ai_list[i], a0_list[i])
+    rng = random.Random(0)
+    for i in range(3):
+        a = sorted((rng.randint(1, 100) for _ in range(30)), reverse=True)
+        bench_row("random[%d]" % i, a, sum(a) // 8)
+
+
+if __name__ == '__main__':
+    run()
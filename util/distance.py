@@ -0,0 +1,90 @@
+import numpy as np
+
+
+def condensed_index(n, i, j):
+    # position of pair (i, j), i < j, in the row-major upper triangle; in
+    # int64 since int32 indices overflow for n above about 65k
+    i = np.asarray(i, dtype=np.int64)
+    j = np.asarray(j, dtype=np.int64)
+    return n * i - i * (i + 1) // 2 + (j - i - 1)
+
+
+class DistanceMatrix(object):
+    # symmetric distances kept either as a full n x n array or condensed to
+    # the n * (n - 1) / 2 entries above the diagonal
+    def __init__(self, data, n=None):
+        self.data = data
+        self.condensed = data.ndim == 1
+        if n is None:
+            if self.condensed:
+                n = int(round((1 + np.sqrt(1 + 8 * len(data))) / 2))
+            else:
+                n = data.shape[0]
+        self.n = n
+
+    @classmethod
+    def from_points(cls, x, y, condensed=False, dtype=np.float64):
+        x = np.asarray(x, dtype=dtype)
+        y = np.asarray(y, dtype=dtype)
+        n = len(x)
+        if not condensed:
+            return cls(np.hypot(x[:, None] - x, y[:, None] - y), n)
+        data = np.empty(n * (n - 1) // 2, dtype=dtype)
+        # one row at a time keeps the peak memory at the output size
+        pos = 0
+        for i in range(n - 1):
+            num = n - i - 1
+            np.hypot(x[i + 1:] - x[i], y[i + 1:] - y[i], out=data[pos:pos + num])
+            pos += num
+        return cls(data, n)
+
+    @classmethod
+    def from_lower(cls, rows, condensed=False, dtype=np.float64):
+        # rows[r] holds the distances from node r + 1 to nodes 0 .. r
+        n = len(rows) + 1
+        lower = np.array([v for row in rows for v in row], dtype=dtype)
+        j, i = np.tril_indices(n, -1)
+        if condensed:
+            data = np.empty(len(lower), dtype=dtype)
+            data[condensed_index(n, i, j)] = lower
+            return cls(data, n)
+        data = np.zeros((n, n), dtype=dtype)
+        data[j, i] = lower
+        data[i, j] = lower
+        return cls(data, n)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        return cls(np.load(path, mmap_mode="r" if mmap else None))
+
+    def save(self, path):
+        np.save(path, self.data)
+
+    def lookup(self, i, j):
+        # vectorized over index arrays
+        if not self.condensed:
+            return self.data[i, j]
+        lo = np.minimum(i, j)
+        hi = np.maximum(i, j)
+        out = np.zeros(lo.shape, dtype=self.data.dtype)
+        off = lo != hi
+        out[off] = self.data[condensed_index(self.n, lo[off], hi[off])]
+        return out
+
+    def __call__(self, i, j):
+        if not self.condensed:
+            return float(self.data[i, j])
+        if i == j:
+            return 0.0
+        if i > j:
+            i, j = j, i
+        return float(self.data[condensed_index(self.n, i, j)])
+
+    def to_full(self):
+        if not self.condensed:
+            return np.asarray(self.data)
+        full = np.zeros((self.n, self.n), dtype=self.data.dtype)
+        i, j = np.triu_indices(self.n, 1)
+        full[i, j] = self.data
+        full[j, i] = self.data
+        return full
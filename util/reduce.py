@@ -1,82 +1,124 @@
 import time
 
 
+def to_mask(sub):
+    mask = 0
+    for t in sub:
+        mask |= 1 << t
+    return mask
+
+
+def to_list(mask):
+    sub = []
+    while mask:
+        low = mask & -mask
+        sub.append(low.bit_length() - 1)
+        mask ^= low
+    return sub
+
+
 def is_ceiling(a, a0, sub):
     num_coef = len(a)
+    mask = to_mask(sub)
     # condition i
     s = sum(a[t] for t in sub)
     if s > a0:
         return False
-    # condition ii
     for t in range(num_coef):
-        if t not in sub and s + a[t] < a0 + 1:
-            return False
-    # condition iii
-    for t in range(num_coef):
-        if t in sub:
+        if mask >> t & 1:
             continue
+        # condition ii
+        if s + a[t] < a0 + 1:
+            return False
+        # condition iii
         t1 = t + 1
-        if t1 < num_coef and t1 in sub:
+        if t1 < num_coef and mask >> t1 & 1:
             if s + a[t] - a[t1] < a0 + 1:
                 return False
     return True
 
 
-def is_roof(a, a0, sub):
+def is_roof_mask(a, a0, sub, mask, s):
+    # sub lists the members of mask, s is their coefficient sum
     num_coef = len(a)
     # condition i
-    s = sum(a[t] for t in sub)
     if s < a0 + 1:
         return False
-    # condition ii
     for t in sub:
+        # condition ii
         if s - a[t] > a0:
             return False
-    # condition iii
-    for t in sub:
+        # condition iii
         t1 = t + 1
-        if t1 < num_coef and t1 not in sub:
+        if t1 < num_coef and not mask >> t1 & 1:
             if s - a[t] + a[t1] > a0:
                 return False
     return True
 
 
-def find_roofs(a, a0):
+def is_roof(a, a0, sub):
+    return is_roof_mask(a, a0, list(sub), to_mask(sub), sum(a[t] for t in sub))
+
+
+def iter_roofs(a, a0):
+    # yields roofs as bitmasks, bit t is set if a[t] belongs to the roof
     num_coef = len(a)
-    roofs = []
+    if num_coef == 0:
+        return
+    # remain[t] bounds the sum of any subset of a[t:]
+    remain = [0] * (num_coef + 1)
+    for t in range(num_coef - 1, -1, -1):
+        remain[t] = remain[t + 1] + max(a[t], 0)
+    # sub is kept sorted with running prefix sums
     sub = [0]
+    sums = [a[0]]
+    mask = 1
     while True:
-        num_sub = len(sub)
-        if is_roof(a, a0, sub):
-            roofs.append(sub)
-        total = sum(a[j] for j in sub)
+        total = sums[-1]
+        if is_roof_mask(a, a0, sub, mask, total):
+            yield mask
         sr = sub[-1]
-        if sr < num_coef - 1:
+        # extending never reaches a0 + 1, so skip the chain up to the last
+        # index like the plain enumeration would
+        hopeless = total + remain[sr + 1] <= a0
+        if sr < num_coef - 1 and not hopeless:
             if total <= a0:
-                sub = sub + [sr + 1]
-            elif total > a0:
-                sub = sub[:-1] + [sr + 1]
+                sub.append(sr + 1)
+                sums.append(total + a[sr + 1])
+                mask |= 1 << (sr + 1)
+            else:
+                sub[-1] = sr + 1
+                sums[-1] = total - a[sr] + a[sr + 1]
+                mask ^= 3 << sr
         else:
-            has_next = False
-            for t in range(num_sub - 2, -1, -1):
+            for t in range(len(sub) - 2, -1, -1):
                 if sub[t + 1] - sub[t] >= 2:
-                    has_next = True
-                    sub = sub[:t] + [sub[t] + 1]
+                    for x in sub[t:]:
+                        mask ^= 1 << x
+                    del sub[t + 1:]
+                    del sums[t + 1:]
+                    sub[t] += 1
+                    sums[t] = (sums[t - 1] if t > 0 else 0) + a[sub[t]]
+                    mask |= 1 << sub[t]
                     break
-            if not has_next:
-                break
-    return roofs
+            else:
+                return
 
 
-def find_ceilings(a, a0):
-    num_coef = len(a)
+def iter_ceilings(a, a0):
+    # ceilings are complements of the roofs of the complementary inequality
+    full = (1 << len(a)) - 1
     dual_a0 = sum(a) - a0 - 1
-    roofs = find_roofs(a, dual_a0)
+    for roof in iter_roofs(a, dual_a0):
+        yield full ^ roof
+
 
-    def get_reverse(sub):
-        return [x for x in range(num_coef) if x not in sub]
+def find_roofs(a, a0):
+    return [to_list(mask) for mask in iter_roofs(a, a0)]
 
-    return [get_reverse(roof) for roof in roofs]
+
+def find_ceilings(a, a0):
+    return [to_list(mask) for mask in iter_ceilings(a, a0)]
 
 
 def test0():
@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"ORSNAP01"
+ALIGN = 64
+
+
+def file_digest(filename, chunk_size=1 << 20):
+    sha = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def source_info(filename, digest=None):
+    st = os.stat(filename)
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha1": digest or file_digest(filename),
+    }
+
+
+def default_cache_path(filename):
+    return filename + ".snap"
+
+
+def align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_snapshot(path, kind, arrays, meta, source):
+    entries = []
+    offset = 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        entries.append({
+            "name": name,
+            "dtype": arr.dtype.str,
+            "shape": list(arr.shape),
+            "offset": offset,
+        })
+        offset = align(offset + arr.nbytes)
+    header = {
+        "kind": kind,
+        "source": source,
+        "meta": meta,
+        "arrays": entries,
+    }
+    blob = json.dumps(header).encode("utf-8")
+    data_start = align(len(MAGIC) + 8 + len(blob))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", data_start))
+        f.write(blob)
+        for entry, arr in zip(entries, arrays.values()):
+            f.seek(data_start + entry["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("%s is not a snapshot file" % path)
+        data_start, = struct.unpack("<Q", f.read(8))
+        blob = f.read(data_start - len(MAGIC) - 8)
+    header = json.loads(blob.rstrip(b"\0").decode("utf-8"))
+    header["data_start"] = data_start
+    return header
+
+
+def read_snapshot(path):
+    header = read_header(path)
+    arrays = {}
+    for entry in header["arrays"]:
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        if np.prod(shape) == 0:
+            arrays[entry["name"]] = np.zeros(shape, dtype=dtype)
+            continue
+        arrays[entry["name"]] = np.memmap(
+            path, dtype=dtype, mode="r", shape=shape,
+            offset=header["data_start"] + entry["offset"])
+    return header, arrays
+
+
+def is_fresh(header, kind, filename):
+    if header["kind"] != kind:
+        return False
+    source = header["source"]
+    st = os.stat(filename)
+    if st.st_size != source["size"]:
+        return False
+    if st.st_mtime_ns == source["mtime_ns"]:
+        return True
+    # touched but possibly unchanged
+    return file_digest(filename) == source["sha1"]
+
+
+def load_cached(filename, kind, parse, cache_path=None):
+    cache_path = cache_path or default_cache_path(filename)
+    if os.path.exists(cache_path):
+        # a broken or cut off snapshot is parsed again
+        try:
+            header = read_header(cache_path)
+            if is_fresh(header, kind, filename):
+                header, arrays = read_snapshot(cache_path)
+                return arrays, header["meta"]
+        except (ValueError, OSError, struct.error):
+            pass
+    source = source_info(filename)
+    arrays, meta = parse(filename)
+    write_snapshot(cache_path, kind, arrays, meta, source)
+    return arrays, meta
+
+
+def convert(filename, cache_path=None):
+    if filename.endswith(".mps"):
+        from lp.mps import parse_mps_cached
+        parse_mps_cached(filename, cache_path=cache_path)
+    elif filename.endswith(".nwk"):
+        from graph.min_cost_flow import parse_network_cached
+        parse_network_cached(filename, cache_path)
+    else:
+        raise ValueError("unknown input format %s" % filename)
+    return cache_path or default_cache_path(filename)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert .mps and .nwk files to binary snapshots")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("-o", "--output",
+                        help="snapshot path, only with a single input")
+    args = parser.parse_args()
+    if args.output and len(args.files) > 1:
+        parser.error("--output needs exactly one input file")
+    for filename in args.files:
+        path = convert(filename, args.output)
+        print("%s -> %s (%d bytes)" % (filename, path, os.path.getsize(path)))
+
+
+if __name__ == '__main__':
+    main()